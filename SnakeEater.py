@@ -1,12 +1,38 @@
-import pygame
-import random
+import time
+startup_time = time.perf_counter()  # For the startup timing report
+
+import argparse
+import atexit
 import os
+import sqlite3
+
+import pygame
+
+import engine
+from assets import AssetManager
+from autopilot import Autopilot
+from capture import FrameCapture, session_directory
+from leaderboard import Leaderboard
+from observation import ObservationPublisher
+from profiler import FrameProfiler, NullProfiler
+from recording import Playback, Recording, start_recording
+from renderer import GameRenderer
+from snapshot import Autosaver, Snapshot
+from sound import SilentSoundManager, SoundManager
+from sprites import SpriteAtlas
+from text_cache import TextCache
+from timestep import FixedTimestep, InputQueue
 
 # Initialize pygame
 pygame.init()
 
-# Initialize pygame mixer for sound
-pygame.mixer.init()
+# Initialize pygame mixer for sound; without an audio device the game runs silent
+try:
+    pygame.mixer.init()
+    audio_available = True
+except pygame.error as e:
+    print(f"No audio device, playing without sound: {e}")
+    audio_available = False
 
 # Define colors
 white = (255, 255, 255)
@@ -29,218 +55,207 @@ pygame.display.set_caption('Snake Eater')
 
 # Set game clock and speed
 clock = pygame.time.Clock()
+menu_fps = 30  # Most redraws per second on the menus (they only redraw on input)
 
 # Snake block size (each segment is 10x10)
 snake_block = 10
-initial_speed = 15  # Initial speed of the snake
-snake_speed = initial_speed  # Current speed of the snake
 
-# Load images
-try:
-    snake_head_img = pygame.image.load('snake_head.png')
-    snake_body_img = pygame.image.load('snake_body.png')
-    snake_tail_img = pygame.image.load('snake_tail.png')
-    apple_image = pygame.image.load('apple.png')
-    bomb_image = pygame.image.load('bomb.png')
-    field_image = pygame.image.load('grassy_field.png')
-    skull_image = pygame.image.load('skull.png')
-    forest_background = pygame.image.load('forest_background.png')  # Main menu background image
-    trophy_image = pygame.image.load('trophy.png')  # Trophy image
-except pygame.error as e:
-    print(f"Unable to load image: {e}")
-    pygame.quit()
-    quit()
+# Board size in cells. The default fills the window; bigger boards (--board) scroll to follow the snake.
+board_cols = game_width // snake_block
+board_rows = game_height // snake_block
+
+# Arrow keys -> snake direction
+key_directions = {
+    pygame.K_LEFT: 'LEFT',
+    pygame.K_RIGHT: 'RIGHT',
+    pygame.K_UP: 'UP',
+    pygame.K_DOWN: 'DOWN',
+}
+
+# Images: file, size and whether it has transparency
+image_files = {
+    'snake_head': ('snake_head.png', (snake_block, snake_block), True),  # Snake head fits in 10x10 grid
+    'snake_body': ('snake_body.png', (snake_block, snake_block), True),
+    'snake_tail': ('snake_tail.png', (snake_block, snake_block), True),
+    'apple': ('apple.png', (20, 20), True),  # Food image scaled to 20x20 pixels
+    'bomb': ('bomb.png', (30, 30), True),  # Bomb image scaled to 30x30 pixels
+    'field': ('grassy_field.png', (game_width, game_height), False),  # Game background (tiled on big boards), opaque
+    'skull': ('skull.png', (50, 50), True),  # Skull image for game over screen
+    'forest_background': ('forest_background.png', (game_width, total_height), False),  # Main menu background
+    'trophy': ('trophy.png', (50, 50), True),  # Trophy image scaled to 50x50 pixels
+}
+
+# Sound effects: file and category
+sound_files = {
+    'crunch': ('crunch.mp3', 'food'),
+    'explosion': ('explosion.mp3', 'hit'),
+    'game_over': ('game_over.mp3', 'jingle'),
+    'button': ('button.mp3', 'ui'),
+    'win': ('win.mp3', 'jingle'),
+    'bonk': ('bonk.mp3', 'hit'),
+}
+
+# Mixer channel reserved for each sound category
+sound_channels = {'ui': 0, 'food': 1, 'hit': 2, 'jingle': 3}
+
+# Music
+menu_music = 'fantasy.mp3'
+game_music = '8bit.mp3'
+
+# Assets are loaded when first needed and then kept; scaled images are also cached on disk
+assets = AssetManager(cache_dir='.asset_cache', start_time=startup_time)
+show_startup_report = False  # Print the startup timing report once the menu is up (--startup-report)
+
+# Function to get an image (scaled, in the display format), loading it if needed
+def image(name):
+    try:
+        return assets.image(*image_files[name])
+    except (pygame.error, OSError) as e:
+        print(f"Unable to load image: {e}")
+        pygame.quit()
+        quit()
+
+# All sound effects and music go through one manager (decoded samples are cached on disk too)
+if audio_available:
+    sounds = SoundManager(sound_files, sound_channels, cache_dir='.asset_cache', timed=assets.timed)
+else:
+    sounds = SilentSoundManager()
+
+# Function to play a sound effect
+def play_sound(name):
+    try:
+        sounds.play(name)
+    except (pygame.error, OSError) as e:
+        print(f"Unable to play sound: {e}")
 
-# Scale images to fit the required sizes
-apple_image = pygame.transform.scale(apple_image, (20, 20))  # Food image scaled to 20x20 pixels
-bomb_image = pygame.transform.scale(bomb_image, (30, 30))  # Bomb image scaled to 30x30 pixels
-skull_image = pygame.transform.scale(skull_image, (50, 50))  # Skull image for game over screen
-field_image = pygame.transform.scale(field_image, (game_width, game_height))  # Game background
-snake_head_img = pygame.transform.scale(snake_head_img, (snake_block, snake_block))  # Snake head fits in 10x10 grid
-snake_body_img = pygame.transform.scale(snake_body_img, (snake_block, snake_block))  # Snake body
-snake_tail_img = pygame.transform.scale(snake_tail_img, (snake_block, snake_block))  # Snake tail
-forest_background = pygame.transform.scale(forest_background, (game_width, total_height))  # Main menu background
-trophy_image = pygame.transform.scale(trophy_image, (50, 50))  # Trophy image scaled to 50x50 pixels
+# Function to start a music track looping
+def play_music(file):
+    try:
+        sounds.play_music(file)
+    except (pygame.error, OSError) as e:
+        print(f"Unable to play music: {e}")
+
+# Everything is loaded in the background, what the main menu needs first so it comes up without waiting
+assets.preload([image_files['forest_background']] + [image_files[name] for name in image_files
+                                                     if name != 'forest_background'])
+sounds.preload(['button'] + [name for name in sound_files if name != 'button'], music=[menu_music, game_music])
 
 # Font settings
 font_style = pygame.font.SysFont("roboto", 25)  # Font for messages
 score_font = pygame.font.SysFont("roboto", 30)  # Font for displaying scores
 title_font = pygame.font.SysFont("roboto", 50)  # Font for the game title in the main menu
-
-# Path for storing scores
-scores_file = "scores.txt"
-
-# Load sounds
+profile_font = pygame.font.SysFont("monospace", 14)  # Font for the profiler overlay
+
+# Rendered text is cached so labels and scores are only rasterized once
+text_cache = TextCache()
+
+# Frame timings, only collected with --profile or --profile-out; F3 shows or hides the overlay
+profiler = NullProfiler()
+show_profile_overlay = False
+use_autopilot = False  # Let the autopilot steer (--autopilot, F2 during a game)
+observer = None  # ObservationPublisher for an external agent (--observe)
+capture = None  # FrameCapture recording the gameplay frames (--capture, F9 pauses)
+autosaver = None  # Autosaver keeping the game in progress on disk (--autosave-interval)
+
+# Gameplay screen renderer; only redraws the parts of the field that changed
+renderer = None
+
+# Function to build the gameplay renderer the first time it is needed
+def game_renderer():
+    global renderer
+    if renderer is None:
+        # Snake head and tail pre-rotated for every direction
+        snake_sprites = SpriteAtlas(image('snake_head'), image('snake_body'), image('snake_tail'))
+        renderer = GameRenderer(dis, snake_block, header_height, image('field'), image('apple'), image('bomb'),
+                                snake_sprites, text_cache, score_font, dark_yellow, black, profiler)
+    return renderer
+
+# Scores database; scores.txt from older versions is imported into it the first time
+scores_file = "scores.db"
+legacy_scores_file = "scores.txt"
 try:
-    crunch_sound = pygame.mixer.Sound('crunch.mp3')
-    explosion_sound = pygame.mixer.Sound('explosion.mp3')
-    game_over_sound = pygame.mixer.Sound('game_over.mp3')
-    button_sound = pygame.mixer.Sound('button.mp3')
-    win_sound = pygame.mixer.Sound('win.mp3')
-    bonk_sound = pygame.mixer.Sound('bonk.mp3')  # Add this line
-except pygame.error as e:
-    print(f"Unable to load sound: {e}")
+    leaderboard = Leaderboard(scores_file, legacy_file=legacy_scores_file)
+except sqlite3.Error as e:
+    print(f"Unable to open scores database: {e}")
     pygame.quit()
     quit()
 
 # Initialize volume
 volume = 0.5  # Default volume (range is 0.0 to 1.0)
-pygame.mixer.music.set_volume(volume)
-crunch_sound.set_volume(volume)
-explosion_sound.set_volume(volume)
-game_over_sound.set_volume(volume)
-button_sound.set_volume(volume)
-win_sound.set_volume(volume)
-bonk_sound.set_volume(volume)
-
-# Function to read scores from the file
+sounds.set_volume(volume)
+
+# Function to read the top 10 scores (None for empty spots)
 def read_scores():
-    if not os.path.exists(scores_file):
-        return [None] * 10  # Return a list of 10 empty spots if no file exists
     try:
-        with open(scores_file, "r") as file:
-            scores = file.readlines()
-        return [int(score.strip()) if score.strip().isdigit() else None for score in scores]
-    except IOError as e:
-        print(f"Error reading scores file: {e}")
+        scores = [entry['score'] for entry in leaderboard.top(10)]
+    except sqlite3.Error as e:
+        print(f"Error reading scores: {e}")
         return [None] * 10
+    return scores + [None] * (10 - len(scores))
 
-# Function to save scores to the file
+# Function to replace all saved scores with the given list
 def save_scores(scores):
     try:
-        with open(scores_file, "w") as file:
-            for score in scores:
-                if score is not None:
-                    file.write(str(score) + "\n")
-                else:
-                    file.write("\n")
-    except IOError as e:
-        print(f"Error writing to scores file: {e}")
-
-# Function to add a new score and update the top 10
-def update_scores(new_score):
-    scores = read_scores()
-    scores = [score for score in scores if score is not None]  # Remove None values
-    scores.append(new_score)
-    scores = sorted(scores, reverse=True)[:10]  # Keep only the top 10 scores
-    while len(scores) < 10:  # Ensure there are always 10 spots
-        scores.append(None)
-    save_scores(scores)
+        leaderboard.replace(scores)
+    except sqlite3.Error as e:
+        print(f"Error writing scores: {e}")
+
+# Function to add a new score, with the best level and length reached in the game
+def update_scores(new_score, level=None, length=None):
+    try:
+        leaderboard.add(new_score, level=level, length=length)
+    except sqlite3.Error as e:
+        print(f"Error writing scores: {e}")
 
 # Function to clear the scores
 def clear_scores():
-    scores = [None] * 10  # Create a list with 10 None values
-    save_scores(scores)
+    save_scores([])
 
 # Function to display the score, lives, and level at the top of the screen
 def our_score(score, lives, level, total_score):
-    pygame.draw.rect(dis, black, [0, 0, game_width, header_height])
-    text = f"Score: {score} | Total: {total_score} | Lives: {lives} | Level: {level}"
-    text_surface = score_font.render(text, True, dark_yellow)
-    text_rect = text_surface.get_rect(center=(game_width // 2, header_height // 2))
-    dis.blit(text_surface, text_rect)
-
-def create_obstacle(snake_list, player_position, obstacles):
-    safe_distance = 30  # Ensure obstacles are at least 3 grid spaces away from the player
-    while True:
-        # Generate a random position for the new obstacle
-        obs_x = round(random.randrange(0, game_width - snake_block) / 10.0) * 10.0
-        obs_y = round(random.randrange(0, game_height - snake_block) / 10.0) * 10.0
-
-        # Ensure obstacle is far enough from the player and does not overlap with snake or existing obstacles
-        too_close_to_player = abs(obs_x - player_position[0]) < safe_distance and abs(obs_y - player_position[1]) < safe_distance
-        obstacle_overlaps_snake = [obs_x, obs_y] in snake_list
-        obstacle_overlaps_existing = [obs_x, obs_y] in obstacles
-
-        if not too_close_to_player and not obstacle_overlaps_snake and not obstacle_overlaps_existing:
-            obstacles.append([obs_x, obs_y])
-            break
-
-    return obstacles
-
-# Function to draw obstacles (bombs)
+    game_renderer().draw_hud(score, lives, level, total_score)
+
+# Function to play the sounds for the events returned by engine.GameState.step()
+def play_event_sounds(events):
+    if engine.EAT in events:
+        play_sound('crunch')
+    if engine.HIT_SELF in events:
+        play_sound('bonk')
+    if engine.HIT_BOMB in events:
+        play_sound('explosion')
+
+# Function to draw obstacles (bombs) into the renderer's static layer
 def draw_obstacles(obstacles):
-    for obstacle in obstacles:
-        # Draw bomb image centered in the grid
-        dis.blit(bomb_image, (obstacle[0] - 10, obstacle[1] + header_height - 10))
+    game_renderer().draw_obstacles(obstacles)
 
+# Function to draw the snake; snake_list holds grid cells, tail first and head last
 def our_snake(snake_block, snake_list, current_direction):
-    # Get the position of the head
-    head = snake_list[-1]  # Last element in the list is the head
-
-    # Rotate the head based on the current direction
-    if current_direction == 'RIGHT':
-        rotated_head = pygame.transform.rotate(snake_head_img, 270)
-    elif current_direction == 'LEFT':
-        rotated_head = pygame.transform.rotate(snake_head_img, 90)
-    elif current_direction == 'DOWN':
-        rotated_head = pygame.transform.rotate(snake_head_img, 180)
-    else:  # Moving up
-        rotated_head = snake_head_img
-
-    # Draw the snake if it has only 2 segments (head and tail)
-    if len(snake_list) == 2:
-        tail = snake_list[0]  # First element is the tail
-        next_tail = snake_list[1]  # Second element is the head
-
-        # Rotate the tail based on its direction relative to the head
-        if tail[0] > next_tail[0]:  # Moving right
-            rotated_tail = pygame.transform.rotate(snake_tail_img, 90)
-        elif tail[0] < next_tail[0]:  # Moving left
-            rotated_tail = pygame.transform.rotate(snake_tail_img, 270)
-        elif tail[1] > next_tail[1]:  # Moving down
-            rotated_tail = snake_tail_img  # No rotation needed
-        else:  # Moving up
-            rotated_tail = pygame.transform.rotate(snake_tail_img, 180)
-
-        # Draw the tail and head
-        dis.blit(rotated_tail, (tail[0], tail[1] + header_height))
-        dis.blit(rotated_head, (head[0], head[1] + header_height))
-        return  # Stop here if the snake has only 2 segments
-
-    # Draw the head
-    dis.blit(rotated_head, (head[0], head[1] + header_height))
-
-    # Draw the body segments (if there are more than 2 segments)
-    if len(snake_list) > 2:
-        for segment in snake_list[1:-1]:
-            dis.blit(snake_body_img, (segment[0], segment[1] + header_height))
-
-        # Draw the tail, rotated based on its direction
-        tail = snake_list[0]
-        next_tail = snake_list[1]
-        if tail[0] > next_tail[0]:  # Moving right
-            rotated_tail = pygame.transform.rotate(snake_tail_img, 90)
-        elif tail[0] < next_tail[0]:  # Moving left
-            rotated_tail = pygame.transform.rotate(snake_tail_img, 270)
-        elif tail[1] > next_tail[1]:  # Moving down
-            rotated_tail = snake_tail_img
-        else:  # Moving up
-            rotated_tail = pygame.transform.rotate(snake_tail_img, 180)
-
-        dis.blit(rotated_tail, (tail[0], tail[1] + header_height))
+    game_renderer().draw_snake(snake_list, current_direction)
 
 # Function to display messages in the center of the screen
 def message(msg, color):
-    mesg = font_style.render(msg, True, color)  # Render the message with specified color
+    mesg = text_cache.render(font_style, msg, color)  # Render the message with specified color
     mesg_rect = mesg.get_rect(center=(game_width // 2, total_height // 2 + 40))  # Center the message
     dis.blit(mesg, mesg_rect)  # Display the message
 
 # Function to display the final score after the game ends
 def display_final_score(total_score):
-    final_score = score_font.render("Total Score: " + str(total_score), True, dark_yellow)  # Render final score
+    final_score = text_cache.render(score_font, "Total Score: " + str(total_score), dark_yellow)  # Render final score
     final_score_rect = final_score.get_rect(center=(game_width // 2, total_height // 2))  # Center the score
     dis.blit(final_score, final_score_rect)  # Display final score
 
-# Main menu function
-def main_menu():
+# Function to wait (without using the CPU) for input, then return every pending event
+def wait_for_events():
+    return [pygame.event.wait()] + pygame.event.get()
+
+# Main menu function; offers Resume Game if `can_resume`, and returns True if that was chosen
+def main_menu(can_resume=False):
     global volume  # Access the global volume variable
+    global show_startup_report
 
     # Stop any current music and play fantasy music
-    pygame.mixer.music.stop()
-    pygame.mixer.music.load('fantasy.mp3')
-    pygame.mixer.music.set_volume(volume)
-    pygame.mixer.music.play(-1)  # Loop indefinitely
+    sounds.stop_music()
+    play_music(menu_music)
 
     # Volume slider variables
     slider_x = 20
@@ -250,65 +265,86 @@ def main_menu():
     slider_pos = slider_x + int(volume * slider_width)
     dragging = False
 
-    while True:
-        dis.blit(forest_background, (0, 0))
-
-        # Title
-        pygame.draw.rect(dis, black, [0, 0, game_width, 100])
-        title_surface = title_font.render("Snake Eater", True, red)
-        title_rect = title_surface.get_rect(center=(game_width // 2, 50))
-        dis.blit(title_surface, title_rect)
-
-        # Buttons
-        start_button = pygame.Rect(game_width // 2 - 75, 150, 150, 50)
-        scoreboard_button = pygame.Rect(game_width // 2 - 75, 225, 150, 50)
-        quit_button = pygame.Rect(game_width // 2 - 75, 300, 150, 50)
-
-        pygame.draw.rect(dis, white, start_button)
-        pygame.draw.rect(dis, white, scoreboard_button)
-        pygame.draw.rect(dis, white, quit_button)
-
-        start_text = font_style.render("Start Game", True, black)
-        scoreboard_text = font_style.render("Scoreboard", True, black)
-        quit_text = font_style.render("Quit", True, black)
-
-        dis.blit(start_text, start_button.move(35, 10))
-        dis.blit(scoreboard_text, scoreboard_button.move(35, 10))
-        dis.blit(quit_text, quit_button.move(55, 10))
-
-        # Volume Slider
-        # Draw slider background
-        pygame.draw.rect(dis, gray, [slider_x, slider_y, slider_width, slider_height])
-        # Draw slider handle
-        pygame.draw.rect(dis, white, [slider_pos - 5, slider_y - 5, 10, slider_height + 10])
-        # Volume label
-        volume_text = font_style.render("Volume", True, white)
-        dis.blit(volume_text, (slider_x, slider_y - 30))
+    # Buttons, moved closer together to make room for Resume Game when it is shown
+    top, spacing = (125, 62) if can_resume else (150, 75)
+    resume_button = pygame.Rect(game_width // 2 - 75, top, 150, 50) if can_resume else None
+    start_button = pygame.Rect(game_width // 2 - 75, top + spacing * can_resume, 150, 50)
+    scoreboard_button = start_button.move(0, spacing)
+    quit_button = scoreboard_button.move(0, spacing)
 
-        pygame.display.update()
+    redraw = True  # Only draw the menu again when something on it changed
+    while True:
+        if redraw:
+            dis.blit(image('forest_background'), (0, 0))
+
+            # Title
+            pygame.draw.rect(dis, black, [0, 0, game_width, 100])
+            title_surface = text_cache.render(title_font, "Snake Eater", red)
+            title_rect = title_surface.get_rect(center=(game_width // 2, 50))
+            dis.blit(title_surface, title_rect)
+
+            # Buttons
+            if resume_button:
+                pygame.draw.rect(dis, white, resume_button)
+                dis.blit(text_cache.render(font_style, "Resume Game", black), resume_button.move(15, 10))
+            pygame.draw.rect(dis, white, start_button)
+            pygame.draw.rect(dis, white, scoreboard_button)
+            pygame.draw.rect(dis, white, quit_button)
+
+            start_text = text_cache.render(font_style, "Start Game", black)
+            scoreboard_text = text_cache.render(font_style, "Scoreboard", black)
+            quit_text = text_cache.render(font_style, "Quit", black)
+
+            dis.blit(start_text, start_button.move(35, 10))
+            dis.blit(scoreboard_text, scoreboard_button.move(35, 10))
+            dis.blit(quit_text, quit_button.move(55, 10))
+
+            # Volume Slider
+            # Draw slider background
+            pygame.draw.rect(dis, gray, [slider_x, slider_y, slider_width, slider_height])
+            # Draw slider handle
+            pygame.draw.rect(dis, white, [slider_pos - 5, slider_y - 5, 10, slider_height + 10])
+            # Volume label
+            volume_text = text_cache.render(font_style, "Volume", white)
+            dis.blit(volume_text, (slider_x, slider_y - 30))
 
-        for event in pygame.event.get():
+            pygame.display.update()
+            redraw = False
+            if show_startup_report:
+                assets.mark('first menu frame')
+                print(assets.report())
+                show_startup_report = False
+            clock.tick(menu_fps)  # Cap redraws while the slider is being dragged
+
+        for event in wait_for_events():
             if event.type == pygame.QUIT:
-                pygame.mixer.music.stop()
+                sounds.stop_music()
                 pygame.quit()
                 quit()
             if event.type == pygame.MOUSEBUTTONDOWN:
+                if resume_button and resume_button.collidepoint(event.pos):
+                    play_sound('button')
+                    sounds.stop_music()
+                    return True
                 if start_button.collidepoint(event.pos):
-                    button_sound.play()
-                    pygame.mixer.music.stop()
-                    return
+                    play_sound('button')
+                    sounds.stop_music()
+                    return False
                 if scoreboard_button.collidepoint(event.pos):
-                    button_sound.play()
-                    pygame.mixer.music.stop()
+                    play_sound('button')
+                    sounds.stop_music()
                     scoreboard_screen()
+                    redraw = True
                 if quit_button.collidepoint(event.pos):
-                    button_sound.play()
-                    pygame.mixer.music.stop()
+                    play_sound('button')
+                    sounds.stop_music()
                     pygame.quit()
                     quit()
                 # Check if clicking on the slider handle
                 if pygame.Rect(slider_x, slider_y, slider_width, slider_height).collidepoint(event.pos):
                     dragging = True
+            if event.type == pygame.WINDOWEXPOSED:  # Window uncovered or restored
+                redraw = True
             if event.type == pygame.MOUSEBUTTONUP:
                 dragging = False
             if event.type == pygame.MOUSEMOTION:
@@ -316,280 +352,373 @@ def main_menu():
                     # Update slider position based on mouse position
                     mouse_x = event.pos[0]
                     slider_pos = max(slider_x, min(mouse_x, slider_x + slider_width))
+                    redraw = True
                     # Calculate volume (0.0 to 1.0)
                     volume = (slider_pos - slider_x) / slider_width
                     # Update volume for all sounds
-                    pygame.mixer.music.set_volume(volume)
-                    crunch_sound.set_volume(volume)
-                    explosion_sound.set_volume(volume)
-                    game_over_sound.set_volume(volume)
-                    button_sound.set_volume(volume)
-                    win_sound.set_volume(volume)
-                    bonk_sound.set_volume(volume)
+                    sounds.set_volume(volume)  # Update volume for the music and all sounds
 
 # Function to display the scoreboard screen
 def scoreboard_screen():
-    win_sound.play()  # Play win sound once when the scoreboard is displayed
-    while True:
-        dis.fill(black)
-
-        # Header
-        header_surface = title_font.render("Top 10 Scores", True, white)
-        header_rect = header_surface.get_rect(center=(game_width // 2, 50))
-        dis.blit(header_surface, header_rect)
-
-        # Trophy images
-        trophy_width = trophy_image.get_width()
-        trophy_height = trophy_image.get_height()
-        spacing = 10  # Spacing between header and trophy
-
-        # Left trophy position
-        left_trophy_x = header_rect.left - trophy_width - spacing
-        trophy_y = header_rect.centery - trophy_height // 2
-        dis.blit(trophy_image, (left_trophy_x, trophy_y))
-
-        # Right trophy position
-        right_trophy_x = header_rect.right + spacing
-        dis.blit(trophy_image, (right_trophy_x, trophy_y))
-
-        # Load the top 10 scores
-        scores = read_scores()
-
-        # Display scores in two columns (5 per column)
-        for i in range(5):
-            # Left column
-            score_text_left = f"{i + 1}. {scores[i] if scores[i] is not None else '---'}"
-            score_surface_left = font_style.render(score_text_left, True, white)
-            dis.blit(score_surface_left, (game_width // 4, 100 + i * 40))
-
-            # Right column
-            score_text_right = f"{i + 6}. {scores[i + 5] if scores[i + 5] is not None else '---'}"
-            score_surface_right = font_style.render(score_text_right, True, white)
-            dis.blit(score_surface_right, (3 * game_width // 4 - 100, 100 + i * 40))
-
-        # Buttons: Clear Scores and Main Menu
-        clear_button = pygame.Rect(game_width // 2 - 75, 310, 150, 50)
-        main_menu_button = pygame.Rect(game_width // 2 - 75, 370, 150, 50)
+    play_sound('win')  # Play win sound once when the scoreboard is displayed
+    scores = read_scores()  # Load the top 10 scores
 
-        pygame.draw.rect(dis, white, clear_button)
-        pygame.draw.rect(dis, white, main_menu_button)
+    # Buttons: Clear Scores and Main Menu
+    clear_button = pygame.Rect(game_width // 2 - 75, 310, 150, 50)
+    main_menu_button = pygame.Rect(game_width // 2 - 75, 370, 150, 50)
 
-        clear_text = font_style.render("Clear Scores", True, black)
-        main_menu_text = font_style.render("Main Menu", True, black)
-
-        dis.blit(clear_text, clear_button.move(15, 10))
-        dis.blit(main_menu_text, main_menu_button.move(15, 10))
+    redraw = True  # Only draw the scoreboard again when the scores changed
+    while True:
+        if redraw:
+            dis.fill(black)
+
+            # Header
+            header_surface = text_cache.render(title_font, "Top 10 Scores", white)
+            header_rect = header_surface.get_rect(center=(game_width // 2, 50))
+            dis.blit(header_surface, header_rect)
+
+            # Trophy images
+            trophy_image = image('trophy')
+            trophy_width = trophy_image.get_width()
+            trophy_height = trophy_image.get_height()
+            spacing = 10  # Spacing between header and trophy
+
+            # Left trophy position
+            left_trophy_x = header_rect.left - trophy_width - spacing
+            trophy_y = header_rect.centery - trophy_height // 2
+            dis.blit(trophy_image, (left_trophy_x, trophy_y))
+
+            # Right trophy position
+            right_trophy_x = header_rect.right + spacing
+            dis.blit(trophy_image, (right_trophy_x, trophy_y))
+
+            # Display scores in two columns (5 per column)
+            for i in range(5):
+                # Left column
+                score_text_left = f"{i + 1}. {scores[i] if scores[i] is not None else '---'}"
+                score_surface_left = text_cache.render(font_style, score_text_left, white)
+                dis.blit(score_surface_left, (game_width // 4, 100 + i * 40))
+
+                # Right column
+                score_text_right = f"{i + 6}. {scores[i + 5] if scores[i + 5] is not None else '---'}"
+                score_surface_right = text_cache.render(font_style, score_text_right, white)
+                dis.blit(score_surface_right, (3 * game_width // 4 - 100, 100 + i * 40))
+
+            # Buttons: Clear Scores and Main Menu
+            pygame.draw.rect(dis, white, clear_button)
+            pygame.draw.rect(dis, white, main_menu_button)
+
+            clear_text = text_cache.render(font_style, "Clear Scores", black)
+            main_menu_text = text_cache.render(font_style, "Main Menu", black)
+
+            dis.blit(clear_text, clear_button.move(15, 10))
+            dis.blit(main_menu_text, main_menu_button.move(15, 10))
 
-        pygame.display.update()
+            pygame.display.update()
+            redraw = False
 
-        for event in pygame.event.get():
+        for event in wait_for_events():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 quit()
             if event.type == pygame.MOUSEBUTTONDOWN:
                 if clear_button.collidepoint(event.pos):
-                    button_sound.play()
+                    play_sound('button')
                     clear_scores()
+                    scores = read_scores()
+                    redraw = True
                 if main_menu_button.collidepoint(event.pos):
-                    button_sound.play()
+                    play_sound('button')
                     return
+            if event.type == pygame.WINDOWEXPOSED:  # Window uncovered or restored
+                redraw = True
+
+# Every finished game is saved here so it can be watched again with --replay
+recordings_dir = "recordings"
+
+# Function to save a finished game's recording under a name that sorts by date
+def save_recording(recording):
+    name = time.strftime('%Y%m%d-%H%M%S') + f"-{recording.seed:016x}.snkrec"
+    try:
+        os.makedirs(recordings_dir, exist_ok=True)
+        recording.save(os.path.join(recordings_dir, name))
+    except OSError as e:
+        print(f"Unable to save recording: {e}")
+
+# The game in progress is saved here every few seconds and when the window is closed, and offered under
+# Resume Game in the main menu until it is over
+autosave_path = os.path.join("saves", "autosave.snksave")
+resume_path = autosave_path  # Snapshot offered under Resume Game (--resume picks another)
+
+# Function to load the saved game to offer in the main menu; None if there is none that can be played here
+def saved_game():
+    if not os.path.exists(resume_path):
+        return None
+    try:
+        saved = Snapshot.load(resume_path)
+    except (OSError, ValueError) as e:
+        print(f"Unable to load saved game: {e}")
+        return None
+    if saved.game_over or (saved.cols, saved.rows) != (board_cols, board_rows):
+        return None
+    return saved
+
+# Function to show the main menu and set up what it leads to: the saved game if the player resumes it,
+# otherwise a new game in `state`. Returns the state to play, its recording (None for a saved game
+# that came without one, like a snapshot.py scenario) and whether it is the saved game.
+def start_from_menu(state):
+    saved = saved_game()
+    if main_menu(saved is not None):
+        return saved.restore(), saved.recording, True
+    return state, start_recording(state), False  # Fresh seed, so the game can be replayed exactly
+
+# Function to delete the autosave a game was resumed from once that game is over, for when autosaving is
+# off and no autosaver will do it; otherwise Resume Game would offer the finished game again. A file
+# picked with --resume is left alone.
+def discard_resumed_game():
+    if resume_path != autosave_path:
+        return
+    try:
+        os.remove(autosave_path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Unable to delete saved game: {e}")
 
 # Main game loop function
 def gameLoop():
     global volume  # Access the global volume variable
+    global show_profile_overlay
+    global use_autopilot
 
-    lives = 3  # Player starts with 3 lives
-    level = 1  # Starting level
-    total_score = 0  # Total score across all lives
-    global snake_speed  # Use the global snake_speed variable
-    game_over = False  # Game over flag
-    current_direction = 'UP'  # Initial direction of the snake
+    state = engine.GameState(cols=board_cols, rows=board_rows)
+    autopilot = Autopilot(board_cols, board_rows)
 
-    main_menu()  # Show the main menu before the game starts
+    state, recording, resumed = start_from_menu(state)  # Show the main menu before the game starts
+    renderer = game_renderer()  # Waits for the game's images, which load while the menu is up
 
     # Stop any current music and play game music
-    pygame.mixer.music.stop()
-    pygame.mixer.music.load('8bit.mp3')
-    pygame.mixer.music.set_volume(volume)
-    pygame.mixer.music.play(-1)  # Loop indefinitely
-
-    while True:
-        game_close = False  # Flag to indicate if the player lost a life
-        snake_speed = initial_speed  # Reset snake speed at the start of each life
-        x1 = game_width / 2  # Snake's initial x position (center)
-        y1 = game_height / 2  # Snake's initial y position (center)
-        x1_change = 0  # No movement in the x direction initially
-        y1_change = 0  # No movement in the y direction initially
-
-        # Initialize snake_list with the starting position
-        snake_head = [x1, y1]
-        snake_list = [snake_head]  # Initialize with the starting position
-        length_of_snake = 1  # Initial length of the snake
-        score_in_current_life = 0  # Score for the current life
-
-        obstacles = []  # Initialize obstacles list
-
-        # Generate random position for food (apple)
-        foodx = round(random.randrange(0, game_width - snake_block) / 10.0) * 10.0
-        foody = round(random.randrange(0, game_height - snake_block) / 10.0) * 10.0
-
-        obstacles = create_obstacle(snake_list, [x1, y1], obstacles)  # Add only one new obstacle
+    sounds.stop_music()
+    play_music(game_music)
 
-        # Initialize the snake movement timer and delay
-        snake_move_timer = 0.0
-        snake_move_delay = 1.0 / snake_speed  # Time in seconds between movements
+    move_timer = FixedTimestep()  # Moves due, independent of the frame rate
+    turns = InputQueue()  # Arrow keys pressed but not used by a move yet
 
-        # Game loop for each life
-        while not game_over and not game_close:
-            delta_time = clock.tick(60) / 1000.0  # Limit to 60 FPS and get delta time in seconds
-            snake_move_timer += delta_time  # Accumulate time
+    while True:
+        move_timer.reset()
+        turns.clear()
+        if observer is not None:
+            observer.publish(state)  # The agent sees the new game before the first move
+        clock.tick()  # Don't count the time spent on the menu or game over screen
+        profiler.discard_frame()
+        renderer.invalidate()  # The menu or game over screen is on the display
+
+        # Game loop, one iteration per rendered frame
+        while not state.game_over:
+            move_timer.advance(clock.tick(60) / 1000.0)  # Limit to 60 FPS and add the frame time
+            profiler.mark('wait')
+            profiler.end_frame(len(state.snake))
 
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:  # Quit the game if the window is closed
+                    if autosaver is not None:
+                        autosaver.save_now(state, recording)  # Resume Game picks up from here next time
                     pygame.quit()
                     quit()
-                if event.type == pygame.KEYDOWN:  # Handle arrow key presses to change direction
-                    if event.key == pygame.K_LEFT and current_direction != 'RIGHT':
-                        x1_change = -snake_block
-                        y1_change = 0
-                        current_direction = 'LEFT'
-                    elif event.key == pygame.K_RIGHT and current_direction != 'LEFT':
-                        x1_change = snake_block
-                        y1_change = 0
-                        current_direction = 'RIGHT'
-                    elif event.key == pygame.K_UP and current_direction != 'DOWN':
-                        y1_change = -snake_block
-                        x1_change = 0
-                        current_direction = 'UP'
-                    elif event.key == pygame.K_DOWN and current_direction != 'UP':
-                        y1_change = snake_block
-                        x1_change = 0
-                        current_direction = 'DOWN'
-
-            # Only move the snake if enough time has passed
-            if snake_move_timer >= snake_move_delay:
-                # Move the snake based on the current direction
-                x1 = (x1 + x1_change) % game_width
-                y1 = (y1 + y1_change) % game_height
-
-                # Update snake position
-                snake_head = [x1, y1]
-                snake_list.append(snake_head)
-                if len(snake_list) > length_of_snake:
-                    del snake_list[0]  # Remove the tail segment when the snake moves
-
-                # Check if the snake hits itself
-                for x in snake_list[:-1]:
-                    if x == snake_head:
-                        bonk_sound.play()  # Play bonk sound once
-                        game_close = True  # The player loses a life if the snake hits itself
-                        current_direction = 'UP'
-                        break  # Exit the loop immediately
-
-                # Check if the snake hits any obstacles
-                for obstacle in obstacles:
-                    if snake_head == obstacle:
-                        explosion_sound.play()
-                        game_close = True  # The player loses a life if the snake hits a bomb
-                        current_direction = 'UP'
-                        break  # Exit the loop immediately
-
-                # If game_close is True, handle life loss and break out of loop
-                if game_close:
-                    total_score += score_in_current_life  # Add current life score to total score
-                    lives -= 1  # Decrease lives
-                    level = 1  # Reset level
-                    if lives <= 0:  # End the game if no lives are left
-                        update_scores(total_score)  # Save the final score
-                        game_over = True
-                        pygame.mixer.music.stop()
-                        game_over_sound.play()
-                    break  # Exit the inner loop to start a new life or end the game
-
-                # Check if the snake eats the food (apple)
-                if x1 == foodx and y1 == foody:
-                    foodx = round(random.randrange(0, game_width - snake_block) / 10.0) * 10.0
-                    foody = round(random.randrange(0, game_height - snake_block) / 10.0) * 10.0
-                    length_of_snake += 1  # Increase the length of the snake
-                    snake_speed += 0.5  # Increase the snake speed
-                    snake_move_delay = 1.0 / snake_speed  # Update the movement delay
-                    score_in_current_life += 1  # Increase the current life score
-                    crunch_sound.play()  # Play crunch sound
-
-                    # Increase level every 5 points and add one new obstacle
-                    if length_of_snake % 5 == 0:
-                        level += 1
-                        obstacles = create_obstacle(snake_list, [x1, y1], obstacles)  # Add only one new obstacle
-
-                snake_move_timer -= snake_move_delay  # Subtract the movement delay
-
-            # Draw the game field (grassy background)
-            dis.blit(field_image, (0, header_height))
-
-            # Draw the food (apple) and obstacles (bombs)
-            dis.blit(apple_image, (foodx - 5, foody + header_height - 5))
-            draw_obstacles(obstacles)
-
-            # Draw the snake and update the score display
-            if snake_list:
-                our_snake(snake_block, snake_list, current_direction)
-            our_score(score_in_current_life, lives, level, total_score)
-            pygame.display.update()
-
-            # If game_close is True, handle life loss and break out of loop
-            if game_close:
-                total_score += score_in_current_life  # Add current life score to total score
-                lives -= 1  # Decrease lives
-                level = 1  # Reset level
-                if lives <= 0:  # End the game if no lives are left
-                    update_scores(total_score)  # Save the final score
-                    game_over = True
-                    pygame.mixer.music.stop()
-                    game_over_sound.play()
-                break  # Exit the inner loop to start a new life or end the game
+                if event.type == pygame.KEYDOWN and event.key in key_directions:  # Arrow keys change direction
+                    turns.push(key_directions[event.key], state.direction)
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:  # Profiler overlay on/off
+                    show_profile_overlay = not show_profile_overlay
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F9 and capture is not None:
+                    capture.paused = not capture.paused  # Capture on/off
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F2:  # Autopilot on/off
+                    use_autopilot = not use_autopilot
+                    turns.clear()
+            profiler.mark('events')
+
+            # Make every move that is due (several per frame once the snake is faster than the frame rate),
+            # each one taking at most one queued turn
+            while move_timer.consume(1.0 / state.speed):
+                direction = autopilot(state) if use_autopilot else turns.pop()
+                if observer is not None:
+                    direction = observer.take_action() or direction  # The agent's turn wins over the keys
+                if direction is not None and state.turn(direction) and recording is not None:
+                    recording.record(state.ticks, direction)
+                events = state.step()
+                renderer.note_move(state)  # So several moves in one frame still only repaint what changed
+                if observer is not None:
+                    observer.publish(state)
+                play_event_sounds(events)
+
+                if engine.LIFE_LOST in events:
+                    move_timer.reset()  # Start the next life from rest
+                    turns.clear()
+                if engine.GAME_OVER in events:
+                    update_scores(state.total_score, state.best_level, state.best_length)  # Save the final score
+                    if recording is not None:
+                        recording.finish(state)
+                        save_recording(recording)
+                    if autosaver is not None:
+                        autosaver.discard()  # Nothing left to resume
+                    elif resumed:
+                        discard_resumed_game()
+                    sounds.stop_music()
+                    play_sound('game_over')
+                    break
+            profiler.mark('update')
+            if autosaver is not None and not state.game_over:
+                autosaver.maybe_save(state, recording)  # Only copies the state; a thread writes it
+                profiler.mark('autosave')
+
+            # Draw whatever changed (snake ends, apple, bombs, score) and update only those rects
+            overlay = profiler.overlay(profile_font) if show_profile_overlay else None
+            renderer.present(state, overlay)
+            if capture is not None:
+                capture.frame()
+                profiler.mark('capture')
 
         # Game over screen
-        if game_over:
-            dis.fill(black)  # Fill the screen with black
-            skull_rect = skull_image.get_rect(center=(game_width // 2, total_height // 2 - 50))  # Display skull image
-            dis.blit(skull_image, skull_rect)
-            display_final_score(total_score)  # Show the final total score
-            message("Game Over! Press R to Restart, Q to Quit, or M for Main Menu", red)  # Game over message
-            pygame.display.update()
+        dis.fill(black)  # Fill the screen with black
+        skull_image = image('skull')
+        skull_rect = skull_image.get_rect(center=(game_width // 2, total_height // 2 - 50))  # Display skull image
+        dis.blit(skull_image, skull_rect)
+        display_final_score(state.total_score)  # Show the final total score
+        message("Game Over! Press R to Restart, Q to Quit, or M for Main Menu", red)  # Game over message
+        pygame.display.update()
 
-            # Handle restart, quit, or return to main menu
-            while game_over:
-                for event in pygame.event.get():
-                    if event.type == pygame.QUIT:
+        # Handle restart, quit, or return to main menu
+        while state.game_over:
+            for event in wait_for_events():
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    quit()
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_q:  # Quit the game
                         pygame.quit()
                         quit()
-                    if event.type == pygame.KEYDOWN:
-                        if event.key == pygame.K_q:  # Quit the game
-                            pygame.quit()
-                            quit()
-                        if event.key == pygame.K_r:  # Restart the game
-                            lives = 3
-                            level = 1
-                            total_score = 0
-                            game_over = False
-                            game_over_sound.stop()
-                            # Play game music again
-                            pygame.mixer.music.load('8bit.mp3')
-                            pygame.mixer.music.set_volume(volume)
-                            pygame.mixer.music.play(-1)
-                            break
-                        if event.key == pygame.K_m:  # Return to the main menu
-                            game_over_sound.stop()
-                            main_menu()  # Return to main menu
-                            lives = 3
-                            level = 1
-                            total_score = 0
-                            game_over = False
-                            # Play game music again
-                            pygame.mixer.music.load('8bit.mp3')
-                            pygame.mixer.music.set_volume(volume)
-                            pygame.mixer.music.play(-1)
-                            break
-
-# Start the game by calling the main game loop
-gameLoop()
+                    if event.key == pygame.K_r:  # Restart the game
+                        recording = start_recording(state)
+                        resumed = False
+                        sounds.stop('game_over')
+                        play_music(game_music)  # Play game music again
+                        break
+                    if event.key == pygame.K_m:  # Return to the main menu
+                        sounds.stop('game_over')
+                        state, recording, resumed = start_from_menu(state)  # Return to main menu
+                        play_music(game_music)  # Play game music again
+                        break
+
+# Watch a recorded game, `speed` times faster than it was played
+def replay_game(recording, speed=1.0):
+    playback = Playback(recording)
+    state = playback.state
+    renderer = game_renderer()
+    renderer.invalidate()
+    play_music(game_music)
+
+    move_timer = FixedTimestep()
+    clock.tick()
+    profiler.discard_frame()
+    while not playback.done:
+        move_timer.advance(clock.tick(60) / 1000.0)
+        profiler.mark('wait')
+        profiler.end_frame(len(state.snake))
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                return
+        profiler.mark('events')
+
+        # At high speeds several moves are due each frame
+        while not playback.done and move_timer.consume(1.0 / (state.speed * speed)):
+            events = playback.step()
+            renderer.note_move(state)
+            play_event_sounds(events)
+            if engine.LIFE_LOST in events:
+                move_timer.reset()  # Same pause as in the real game
+        profiler.mark('update')
+
+        renderer.present(state, profiler.overlay(profile_font) if show_profile_overlay else None)
+        if capture is not None:
+            capture.frame()
+            profiler.mark('capture')
+
+    sounds.stop_music()
+    dis.fill(black)
+    display_final_score(state.total_score)
+    message("Replay finished" + ("" if playback.matches() else " (did not match the recording!)"), red)
+    pygame.display.update()
+    while not any(event.type in (pygame.QUIT, pygame.KEYDOWN) for event in wait_for_events()):
+        pass
+
+# Start the game when run as a script
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Snake Eater')
+    parser.add_argument('--startup-report', action='store_true',
+                        help='print how long each asset took to load once the main menu is up')
+    parser.add_argument('--profile', action='store_true',
+                        help='time every frame and show the timings over the game (F3 hides them)')
+    parser.add_argument('--profile-out', metavar='FILE',
+                        help='write the timings of every frame to FILE when the game exits (.json for JSON, else CSV)')
+    parser.add_argument('--board', metavar='COLSxROWS', help='play on a board of this many cells, e.g. 1000x1000')
+    parser.add_argument('--autopilot', action='store_true', help='let the computer play (F2 toggles it in a game)')
+    parser.add_argument('--observe', metavar='NAME',
+                        help='publish the board to shared memory NAME every move and take turns from it '
+                             '(see observation.py)')
+    parser.add_argument('--capture', metavar='DIR',
+                        help='save the gameplay frames in a new folder under DIR (F9 pauses)')
+    parser.add_argument('--capture-format', choices=['png', 'raw'], default='png',
+                        help='png files, or one raw RGB24 file for ffmpeg (default png)')
+    parser.add_argument('--capture-scale', type=float, default=1.0, metavar='X', help='scale frames by X, e.g. 0.5')
+    parser.add_argument('--capture-every', type=int, default=1, metavar='N', help='keep every N-th frame')
+    parser.add_argument('--autosave-interval', type=float, default=5.0, metavar='SECONDS',
+                        help=f"save the game in progress to {autosave_path} this often, 0 for never (default 5)")
+    parser.add_argument('--resume', metavar='FILE',
+                        help='offer this snapshot (e.g. from snapshot.py scenario) under Resume Game; '
+                             'the board size is taken from it')
+    parser.add_argument('--replay', metavar='FILE', help='watch a recorded game instead of playing')
+    parser.add_argument('--replay-speed', type=float, default=1.0, metavar='X',
+                        help='play the replay X times faster (default 1)')
+    args = parser.parse_args()
+    show_startup_report = args.startup_report
+    use_autopilot = args.autopilot
+    if args.board:
+        try:
+            board_cols, board_rows = (int(n) for n in args.board.lower().split('x'))
+        except ValueError:
+            parser.error(f"--board must look like 1000x1000, not {args.board}")
+        if min(board_cols, board_rows) < 2 * engine.safe_distance:
+            parser.error(f"--board must be at least {2 * engine.safe_distance} cells each way")
+    if args.capture_every < 1:
+        parser.error(f"--capture-every must be 1 or more, not {args.capture_every}")
+    if not 0 < args.replay_speed < float('inf'):
+        parser.error(f"--replay-speed must be a number above 0, not {args.replay_speed}")
+    if args.resume:
+        try:
+            saved = Snapshot.load(args.resume)
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot resume from {args.resume}: {e}")
+        resume_path = args.resume
+        board_cols, board_rows = saved.cols, saved.rows
+    if args.autosave_interval > 0 and not args.replay:
+        autosaver = Autosaver(autosave_path, args.autosave_interval)
+        atexit.register(autosaver.close)
+    if args.profile or args.profile_out:
+        profiler = FrameProfiler(keep_all=args.profile_out is not None)
+        show_profile_overlay = args.profile
+        if args.profile_out:
+            atexit.register(profiler.dump, args.profile_out)
+    if args.observe:
+        try:
+            observer = ObservationPublisher(board_cols, board_rows, args.observe)
+        except FileExistsError:
+            parser.error(f"shared memory {args.observe} already exists")
+        atexit.register(observer.close)
+    if args.capture:
+        capture = FrameCapture(dis, session_directory(args.capture), args.capture_format, args.capture_scale,
+                               every=args.capture_every)
+        atexit.register(lambda: print(capture.close()))
+    if args.replay:
+        replay_game(Recording.load(args.replay), args.replay_speed)
+        pygame.quit()
+    else:
+        gameLoop()
@@ -0,0 +1,413 @@
+import random
+from collections import deque
+
+import engine
+from recording import code_directions, direction_codes, read_varint, write_varint
+from timestep import InputQueue
+
+# Several snakes on one board, with the rules of engine.GameState: each
+# player has their own lives, score, level and speed, eats apples, levels up
+# every level_length and gets one bomb per level, and loses a life on a bomb
+# or on any snake, their own or someone else's. Two heads meeting on the same
+# cell (or the same apple) both lose a life. A new life clears only that
+# player's bombs. There is one apple per player on the board.
+#
+# Arena.step() is one server tick. Every player moves at their own speed, so
+# a tick makes zero, one or several moves per player; moves that happen in
+# the same tick are resolved together, so the order players joined in never
+# decides who hits whom.
+#
+# Every change is also appended to Arena.ops as a compact op list that an
+# ArenaView on the client applies to its own copy of the board: a move is
+# the player id plus one byte (direction code << 1 | tail dropped), so a
+# tick costs a few bytes per snake however long the snakes are.
+# snapshot() gives the ops that build the whole board for a new client.
+
+# Ops; every number is a varint and cells are y * cols + x
+OP_JOIN = 1  # player, name length, name (UTF-8)
+OP_LEAVE = 2  # player
+OP_SNAKE = 3  # player, segment count, cells tail first (replaces the snake)
+OP_MOVE = 4  # player, direction code << 1 | tail dropped
+OP_CLEAR = 5  # player (their snake is taken off the board)
+OP_FOOD = 6  # cell
+OP_EAT = 7  # cell (the apple there is gone)
+OP_BOMB = 8  # cell
+OP_UNBOMB = 9  # cell
+OP_STATS = 10  # player, score, total score, lives, level
+
+
+class Player:
+    def __init__(self, id, name, lives):
+        self.id = id
+        self.name = name
+        self.snake = deque()  # Cells, tail first and head last
+        self.length = 1
+        self.direction = 'UP'
+        self.velocity = (0, 0)  # Still until the first turn, as in the single-player game
+        self.speed = engine.initial_speed
+        self.due = 0.0  # Seconds of movement owed, as in timestep.FixedTimestep
+        self.moves = 0  # Moves due in the current tick
+        self.turns = InputQueue()
+        self.score = 0
+        self.total_score = 0
+        self.lives = lives
+        self.level = 1
+        self.bombs = []  # Bombs this player's level-ups put down
+
+    @property
+    def alive(self):
+        return self.lives > 0
+
+
+class Arena:
+    def __init__(self, cols=engine.board_cols, rows=engine.board_rows, lives=engine.initial_lives, seed=None):
+        self.cols = cols
+        self.rows = rows
+        self.max_lives = lives
+        self.rng = random.Random(seed)
+        self.free = engine.FreeCells(cols, rows)
+        self.occupied = bytearray(cols * rows)  # Snake segments on each cell, all snakes together
+        self.players = {}
+        self.foods = set()
+        self.bombs = set()
+        self.next_id = 1
+        self.ticks = 0
+        self.ops = bytearray()  # Changes since the last take_ops()
+
+    def cell_number(self, cell):
+        return cell[1] * self.cols + cell[0]
+
+    def write_cell(self, cell):
+        write_varint(self.ops, cell[1] * self.cols + cell[0])
+
+    def write_stats(self, player):
+        self.ops.append(OP_STATS)
+        for n in (player.id, player.score, player.total_score, player.lives, player.level):
+            write_varint(self.ops, n)
+
+    # Ops since the last call, ready to send
+    def take_ops(self):
+        ops = bytes(self.ops)
+        self.ops.clear()
+        return ops
+
+    # Ops that build the current board from nothing
+    def snapshot(self):
+        ops = self.ops
+        self.ops = bytearray()
+        for player in self.players.values():
+            self.write_join(player)
+            self.write_snake(player)
+            self.write_stats(player)
+        for cell in self.foods:
+            self.ops.append(OP_FOOD)
+            self.write_cell(cell)
+        for cell in self.bombs:
+            self.ops.append(OP_BOMB)
+            self.write_cell(cell)
+        snapshot, self.ops = bytes(self.ops), ops
+        return snapshot
+
+    def write_join(self, player):
+        name = player.name.encode()
+        self.ops.append(OP_JOIN)
+        write_varint(self.ops, player.id)
+        write_varint(self.ops, len(name))
+        self.ops += name
+
+    def write_snake(self, player):
+        self.ops.append(OP_SNAKE)
+        write_varint(self.ops, player.id)
+        write_varint(self.ops, len(player.snake))
+        for cell in player.snake:
+            self.write_cell(cell)
+
+    def add_segment(self, cell):
+        number = self.cell_number(cell)
+        self.occupied[number] += 1
+        if self.occupied[number] == 1:
+            self.free.take(cell)
+
+    def remove_segment(self, cell):
+        number = self.cell_number(cell)
+        self.occupied[number] -= 1
+        if not self.occupied[number] and cell not in self.foods and cell not in self.bombs:
+            self.free.release(cell)
+
+    def near_head(self, cell):
+        return any(player.snake and abs(cell[0] - player.snake[-1][0]) < engine.safe_distance and
+                   abs(cell[1] - player.snake[-1][1]) < engine.safe_distance for player in self.players.values())
+
+    # A random free cell, away from every head if `away`; None if there is no
+    # room. Like GameState.create_obstacle(), a pick near a head is retried
+    # once with the cells around the heads taken out.
+    def random_cell(self, away):
+        cell = self.free.choice(self.rng)
+        if cell is None or not away or not self.near_head(cell):
+            return cell
+        hidden = []
+        for player in self.players.values():
+            if not player.snake:
+                continue
+            head_x, head_y = player.snake[-1]
+            for y in range(max(head_y - engine.safe_distance + 1, 0), min(head_y + engine.safe_distance, self.rows)):
+                for x in range(max(head_x - engine.safe_distance + 1, 0),
+                               min(head_x + engine.safe_distance, self.cols)):
+                    if (x, y) in self.free:
+                        hidden.append((x, y))
+                        self.free.take((x, y))
+        cell = self.free.choice(self.rng)
+        for hidden_cell in hidden:
+            self.free.release(hidden_cell)
+        return cell
+
+    # Keep one apple per player on the board
+    def top_up_food(self):
+        while len(self.foods) < max(len(self.players), 1):
+            cell = self.random_cell(away=False)
+            if cell is None:
+                return
+            self.free.take(cell)
+            self.foods.add(cell)
+            self.ops.append(OP_FOOD)
+            self.write_cell(cell)
+
+    def add_bomb(self, player):
+        cell = self.random_cell(away=True)
+        if cell is None:
+            return
+        self.free.take(cell)
+        self.bombs.add(cell)
+        player.bombs.append(cell)
+        self.ops.append(OP_BOMB)
+        self.write_cell(cell)
+
+    def clear_snake(self, player):
+        for cell in player.snake:
+            self.remove_segment(cell)
+        player.snake.clear()
+        self.ops.append(OP_CLEAR)
+        write_varint(self.ops, player.id)
+
+    def clear_bombs(self, player):
+        for cell in player.bombs:
+            self.bombs.discard(cell)
+            if not self.occupied[self.cell_number(cell)]:
+                self.free.release(cell)
+            self.ops.append(OP_UNBOMB)
+            self.write_cell(cell)
+        player.bombs = []
+
+    def add_player(self, name):
+        player = Player(self.next_id, name, self.max_lives)
+        self.next_id += 1
+        self.players[player.id] = player
+        self.write_join(player)
+        self.new_life(player)
+        return player
+
+    def remove_player(self, player_id):
+        player = self.players.pop(player_id, None)
+        if player is None:
+            return
+        if player.snake:
+            self.clear_snake(player)
+        self.clear_bombs(player)
+        self.ops.append(OP_LEAVE)
+        write_varint(self.ops, player.id)
+
+    # Queue a turn for the player's next move; same rules as the arrow keys
+    def turn(self, player_id, direction):
+        player = self.players.get(player_id)
+        if player is not None and player.alive:
+            player.turns.push(direction, player.direction)
+
+    # Start a new game for a player who has no lives left
+    def restart(self, player_id):
+        player = self.players.get(player_id)
+        if player is not None and not player.alive:
+            player.lives = self.max_lives
+            player.total_score = 0
+            self.new_life(player)
+
+    # Fresh one-cell snake on a free cell away from the other heads, plus the
+    # player's first bomb, as in GameState.new_life()
+    def new_life(self, player):
+        if player.snake:
+            self.clear_snake(player)
+        self.clear_bombs(player)
+        player.speed = engine.initial_speed
+        player.due = 0.0
+        player.direction = 'UP'
+        player.velocity = (0, 0)
+        player.turns.clear()
+        player.length = 1
+        player.score = 0
+        player.level = 1
+        self.place_snake(player)
+        self.write_stats(player)
+        self.top_up_food()
+        self.add_bomb(player)
+
+    # Put a player's one-cell snake on a free cell, away from the other heads
+    # if there is room for that. With no free cell at all the player waits
+    # without a snake, and step() tries again every tick.
+    def place_snake(self, player):
+        start = self.random_cell(away=True)
+        if start is None:
+            start = self.random_cell(away=False)
+        if start is None:
+            return False
+        player.snake.append(start)
+        self.add_segment(start)
+        self.write_snake(player)
+        return True
+
+    def lose_life(self, player):
+        player.total_score += player.score
+        player.lives -= 1
+        player.level = 1
+        if player.alive:
+            self.new_life(player)
+        else:
+            self.clear_snake(player)
+            self.clear_bombs(player)
+            self.write_stats(player)
+
+    # One server tick of `seconds`. Each player gets the moves their speed
+    # makes due; moves are then made in rounds, everyone with a move left
+    # moving together in each round.
+    def step(self, seconds):
+        self.ticks += 1
+        moving = []
+        for player in self.players.values():
+            if not player.alive or (not player.snake and not self.place_snake(player)):
+                continue
+            player.due += seconds
+            player.moves = 0
+            while player.due >= 1.0 / player.speed:
+                player.due -= 1.0 / player.speed
+                player.moves += 1
+            if player.moves:
+                moving.append(player)
+        while moving:
+            self.move(moving)
+            moving = [player for player in moving if player.moves and player.alive and player.snake]
+
+    def move(self, players):
+        cols, rows = self.cols, self.rows
+        moved = []
+        for player in players:
+            player.moves -= 1
+            direction = player.turns.pop()
+            if direction is not None and direction != engine.opposite[player.direction]:
+                player.direction = direction
+                player.velocity = engine.directions[direction]
+            if player.velocity == (0, 0):
+                continue
+            head_x, head_y = player.snake[-1]
+            head = ((head_x + player.velocity[0]) % cols, (head_y + player.velocity[1]) % rows)
+            player.snake.append(head)
+            self.add_segment(head)
+            dropped = len(player.snake) > player.length
+            if dropped:
+                self.remove_segment(player.snake.popleft())
+            self.ops.append(OP_MOVE)
+            write_varint(self.ops, player.id)
+            self.ops.append(direction_codes[player.direction] << 1 | dropped)
+            moved.append(player)
+
+        # Every tail has moved on before anyone is checked, so following a
+        # tail (anyone's) is safe and two heads on one cell both count
+        dead = [player for player in moved
+                if self.occupied[self.cell_number(player.snake[-1])] > 1 or player.snake[-1] in self.bombs]
+        for player in dead:
+            self.lose_life(player)
+        for player in moved:
+            head = player.snake[-1] if player.snake else None
+            if player in dead or head not in self.foods:
+                continue
+            self.foods.discard(head)
+            self.ops.append(OP_EAT)
+            self.write_cell(head)
+            player.length += 1
+            player.speed += engine.speed_increase
+            player.score += 1
+            if player.length % engine.level_length == 0:
+                player.level += 1
+                self.add_bomb(player)
+            self.write_stats(player)
+        self.top_up_food()
+
+
+# A client's copy of an Arena, kept up to date from the ops it sends
+class ArenaView:
+    def __init__(self, cols, rows):
+        self.cols = cols
+        self.rows = rows
+        self.names = {}
+        self.snakes = {}  # Player -> deque of cell numbers, tail first
+        self.occupied = bytearray(cols * rows)
+        self.foods = set()
+        self.bombs = set()
+        self.stats = {}  # Player -> (score, total score, lives, level)
+
+    def clear_snake(self, player):
+        for number in self.snakes.pop(player, ()):
+            self.occupied[number] -= 1
+
+    # Apply the ops in data[pos:]
+    def apply(self, data, pos=0):
+        while pos < len(data):
+            op = data[pos]
+            pos += 1
+            if op == OP_MOVE:
+                player, pos = read_varint(data, pos)
+                code = data[pos]
+                pos += 1
+                snake = self.snakes[player]
+                dx, dy = engine.directions[code_directions[code >> 1]]
+                y, x = divmod(snake[-1], self.cols)
+                head = (y + dy) % self.rows * self.cols + (x + dx) % self.cols
+                snake.append(head)
+                self.occupied[head] += 1
+                if code & 1:
+                    self.occupied[snake.popleft()] -= 1
+            elif op == OP_STATS:
+                values = []
+                for _ in range(5):
+                    n, pos = read_varint(data, pos)
+                    values.append(n)
+                self.stats[values[0]] = tuple(values[1:])
+            elif op in (OP_FOOD, OP_EAT, OP_BOMB, OP_UNBOMB):
+                number, pos = read_varint(data, pos)
+                cells = self.foods if op in (OP_FOOD, OP_EAT) else self.bombs
+                if op in (OP_FOOD, OP_BOMB):
+                    cells.add(number)
+                else:
+                    cells.discard(number)
+            elif op == OP_SNAKE:
+                player, pos = read_varint(data, pos)
+                count, pos = read_varint(data, pos)
+                self.clear_snake(player)
+                snake = self.snakes[player] = deque()
+                for _ in range(count):
+                    number, pos = read_varint(data, pos)
+                    snake.append(number)
+                    self.occupied[number] += 1
+            elif op == OP_CLEAR:
+                player, pos = read_varint(data, pos)
+                self.clear_snake(player)
+            elif op == OP_JOIN:
+                player, pos = read_varint(data, pos)
+                size, pos = read_varint(data, pos)
+                self.names[player] = data[pos:pos + size].decode()
+                pos += size
+            elif op == OP_LEAVE:
+                player, pos = read_varint(data, pos)
+                self.clear_snake(player)
+                self.names.pop(player, None)
+                self.stats.pop(player, None)
+            else:
+                raise ValueError(f"unknown op {op}")
+        return pos
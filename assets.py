@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+
+import pygame
+
+from sprites import display_format
+
+# Loads the game's images. Anything asked for is loaded on the spot, but
+# preload() can hand a list of images to a background thread so the first
+# screen appears before everything else is decoded. Scaled images are kept in
+# memory keyed by source file and target size, and optionally in a directory
+# on disk so the next start can skip decoding and scaling the big
+# backgrounds. Every load is timed for the startup report; sound.SoundManager
+# reports its loads through timed() as well.
+
+
+class AssetManager:
+    def __init__(self, base_dir='.', cache_dir=None, start_time=None):
+        self.base_dir = base_dir
+        self.cache_dir = cache_dir
+        self.start_time = time.perf_counter() if start_time is None else start_time
+        self.images = {}  # (file, size, alpha) -> surface in display format
+        self.scaled = {}  # (file, size, alpha) -> scaled surface from the background thread
+        self.pending = {}  # key -> threading.Event set once the background thread has it
+        self.errors = {}  # key -> exception raised loading it in the background
+        self.lock = threading.Lock()
+        self.timings = []  # (label, thread name, start, seconds) since start_time
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, file):
+        return os.path.join(self.base_dir, file)
+
+    # Time a load (or any other startup step) for the report
+    def timed(self, label, load, *args):
+        start = time.perf_counter()
+        result = load(*args)
+        with self.lock:
+            self.timings.append((label, threading.current_thread().name, start - self.start_time,
+                                 time.perf_counter() - start))
+        return result
+
+    # Record a point in time, like the first menu frame being shown
+    def mark(self, label):
+        with self.lock:
+            self.timings.append((label, threading.current_thread().name, time.perf_counter() - self.start_time, 0.0))
+
+    # Load `file` scaled to `size`, going through the disk cache if there is one
+    def load_scaled(self, file, size):
+        source = self.path(file)
+        if self.cache_dir is None:
+            return pygame.transform.scale(pygame.image.load(source), size)
+        stem = os.path.splitext(file)[0]
+        cached = os.path.join(self.cache_dir, f"{stem}-{size[0]}x{size[1]}-{os.stat(source).st_mtime_ns}.png")
+        if os.path.exists(cached):
+            return pygame.image.load(cached)
+        surface = pygame.transform.scale(pygame.image.load(source), size)
+        partial = cached + '.part.png'
+        pygame.image.save(surface, partial)
+        os.replace(partial, cached)
+        return surface
+
+    # Wait for `key` if the background thread has it queued. Returns False if
+    # it was never queued.
+    def wait_for(self, key):
+        with self.lock:
+            done = self.pending.get(key)
+        if done is None:
+            return False
+        done.wait()
+        with self.lock:
+            del self.pending[key]
+            error = self.errors.pop(key, None)
+        if error is not None:
+            raise error
+        return True
+
+    # Image ready to blit: `file` scaled to `size` in the display's pixel
+    # format, with per-pixel alpha unless alpha is False
+    def image(self, file, size, alpha=True):
+        key = (file, size, alpha)
+        surface = self.images.get(key)
+        if surface is not None:
+            return surface
+        if not self.wait_for(key):
+            self.preload_image(key)
+        with self.lock:
+            scaled = self.scaled.pop(key)
+        surface = self.images[key] = display_format(scaled, alpha)
+        return surface
+
+    # Load images ((file, size, alpha) tuples) on a background thread.
+    # Asking for one before it is done waits for that one only.
+    def preload(self, images):
+        with self.lock:
+            keys = [key for key in images if key not in self.pending and key not in self.images]
+            for key in keys:
+                self.pending[key] = threading.Event()
+        thread = threading.Thread(target=self.run_preload, args=(keys,), name='asset-loader', daemon=True)
+        thread.start()
+        return thread
+
+    def run_preload(self, keys):
+        for key in keys:
+            try:
+                self.preload_image(key)
+            except (pygame.error, OSError) as e:
+                with self.lock:
+                    self.errors[key] = e
+            self.pending[key].set()
+
+    def preload_image(self, key):
+        file, size, _ = key
+        scaled = self.timed(file, self.load_scaled, file, size)
+        with self.lock:
+            self.scaled[key] = scaled
+
+    # Startup timing report: one line per load or mark, in the order they started
+    def report(self):
+        lines = [f"{'start ms':>9} {'took ms':>8}  {'thread':<12} what"]
+        with self.lock:
+            timings = sorted(self.timings, key=lambda t: t[2])
+        for label, thread, start, seconds in timings:
+            lines.append(f"{start * 1000:>9.1f} {seconds * 1000:>8.1f}  {thread:<12} {label}")
+        return "\n".join(lines)
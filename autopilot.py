@@ -0,0 +1,260 @@
+import argparse
+import time
+from array import array
+from collections import deque
+
+import engine
+
+# A bot that plays Snake Eater through the same direction names the arrow
+# keys produce: Autopilot(cols, rows) is a policy, autopilot(state) returns
+# the direction for the next move. Each move it:
+#   1. keeps a distance field from the apple (a BFS around the bombs,
+#      wrapping at the edges). The field is reused until the apple moves or
+#      a bomb appears, and a new one is grown by at most field_budget cells
+#      per move (by default enough to cover the board in about the moves it
+#      takes to cross it), so a huge board never stalls a frame;
+#   2. ranks the moves that are safe right now by that distance (by straight
+#      wrap-around distance where the field has not reached yet);
+#   3. takes the best one from which the head can still reach the tail:
+#      a BFS that knows when each body cell will be free, stopping once it
+#      reaches a body cell in time to follow it or has seen check_budget
+#      cells;
+#   4. otherwise follows a Hamiltonian cycle of the board if that move passes
+#      the same check, and otherwise takes the move with the most room.
+# Which body cells free up when comes from the tick each cell was entered,
+# updated by one write per move, so the cost of a move does not grow with
+# the snake's length. The board-sized buffers are allocated once: a new
+# distance field, bomb grid or escape check bumps a generation stamp
+# instead of clearing them.
+
+# Neighbour order used everywhere below
+names = ['UP', 'DOWN', 'LEFT', 'RIGHT']
+
+
+class Autopilot:
+    def __init__(self, cols=engine.board_cols, rows=engine.board_rows, field_budget=None, check_budget=500):
+        self.cols = cols
+        self.rows = rows
+        self.size = cols * rows
+        if field_budget is None:
+            field_budget = max(500, 2 * self.size // (cols + rows))
+        self.field_budget = field_budget
+        self.check_budget = check_budget
+        self.entered = array('q', [0]) * self.size  # Tick the head entered each body cell
+        self.snake = None  # Snake object `entered` was filled in for, and at which tick
+        self.ticks = None
+        self.bombs = array('q', [0]) * self.size  # A cell holds a bomb if it is marked with bomb_stamp
+        self.bomb_stamp = 0
+        self.bomb_set = None  # The state's obstacles set the grid was built from, and its size
+        self.bomb_count = -1
+        self.target = None  # Apple the field measures distance to
+        self.field = array('q', [0]) * self.size  # field_base + distance for the cells the field has reached
+        self.field_base = 0
+        self.frontier = deque()
+        self.seen = array('q', [0]) * self.size  # Cells the current escape check has seen hold seen_stamp
+        self.seen_stamp = 0
+
+    def cell(self, xy):
+        return xy[1] * self.cols + xy[0]
+
+    # Up, down, left and right neighbours of a cell, wrapping at the edges
+    def neighbours(self, cell):
+        cols, size = self.cols, self.size
+        x = cell % cols
+        return (cell - cols if cell >= cols else cell - cols + size,
+                cell + cols if cell < size - cols else cell + cols - size,
+                cell - 1 if x else cell + cols - 1,
+                cell + 1 if x < cols - 1 else cell - x)
+
+    # Shortest number of moves between two cells on an empty board
+    def wrap_distance(self, a, b):
+        ay, ax = divmod(a, self.cols)
+        by, bx = divmod(b, self.cols)
+        dx = abs(ax - bx)
+        dy = abs(ay - by)
+        return min(dx, self.cols - dx) + min(dy, self.rows - dy)
+
+    # Next cell on a Hamiltonian cycle of the board, or None if the board has
+    # none (both sides odd). The cycle runs along the top row, snakes through
+    # the other rows from column 1 and comes back up column 0; with an odd
+    # number of rows the same cycle is used turned on its side.
+    def cycle_next(self, cell):
+        y, x = divmod(cell, self.cols)
+        if self.rows % 2 == 0:
+            x, y = cycle_step(x, y, self.cols, self.rows)
+        elif self.cols % 2 == 0:
+            y, x = cycle_step(y, x, self.rows, self.cols)
+        else:
+            return None
+        return y * self.cols + x
+
+    # Keep `entered` in step with the snake: one write per move, or a full
+    # refill for a new snake or after moves that were not seen
+    def track(self, state):
+        snake = state.snake
+        if snake is self.snake and state.ticks == self.ticks:
+            return
+        if snake is self.snake and state.ticks == self.ticks + 1:
+            self.entered[self.cell(snake.head)] = state.ticks
+        else:
+            first = state.ticks - len(snake) + 1
+            for i, xy in enumerate(snake):
+                self.entered[self.cell(xy)] = first + i
+        self.snake = snake
+        self.ticks = state.ticks
+
+    # Start a new distance field when the apple moved or the bombs changed,
+    # then grow the current one by up to field_budget cells
+    def update_field(self, state):
+        obstacles = state.obstacles
+        if obstacles is not self.bomb_set or len(obstacles) != self.bomb_count:
+            if obstacles is not self.bomb_set or len(obstacles) < self.bomb_count:
+                self.bomb_stamp += 1  # A new set: forget every bomb marked so far
+            for xy in obstacles:
+                self.bombs[self.cell(xy)] = self.bomb_stamp
+            self.bomb_set = obstacles
+            self.bomb_count = len(obstacles)
+            self.target = None
+        food = None if state.food is None else self.cell(state.food)
+        if food != self.target:
+            self.target = food
+            self.field_base += self.size  # Distances stay below the board size
+            self.frontier.clear()
+            if food is not None:
+                self.field[food] = self.field_base
+                self.frontier.append(food)
+        field, frontier, bombs, neighbours = self.field, self.frontier, self.bombs, self.neighbours
+        base, stamp = self.field_base, self.bomb_stamp
+        budget = self.field_budget
+        while frontier and budget > 0:
+            cell = frontier.popleft()
+            distance = field[cell] + 1
+            for neighbour in neighbours(cell):
+                if field[neighbour] < base and bombs[neighbour] != stamp:
+                    field[neighbour] = distance
+                    frontier.append(neighbour)
+                    budget -= 1
+
+    # Moves until a cell is free (0 if it is free now). `grow` is extra
+    # growth still to come, which keeps the tail in place that much longer.
+    def moves_until_free(self, state, cell, grow=0):
+        if not state.snake.counts[cell]:
+            return 0
+        tail = self.entered[self.cell(state.snake.tail)]
+        return self.entered[cell] - tail + 1 + state.length - len(state.snake) + grow
+
+    # After moving to `start`, can the head still get to a body cell by the
+    # time it is free (and so follow the tail around)? BFS that counts moves.
+    # Returns (safe, cells seen); running out of budget counts as safe.
+    def escape(self, state, start, grow):
+        bombs, counts, entered, neighbours = self.bombs, state.snake.counts, self.entered, self.neighbours
+        stamp = self.bomb_stamp
+        # A body cell is free once `moves` reaches entered[cell] - freed_offset
+        freed_offset = self.entered[self.cell(state.snake.tail)] - 1 - (state.length - len(state.snake)) - grow
+        enough = min(self.check_budget, len(state.snake) + 1)
+        self.seen_stamp += 1
+        seen, seen_stamp = self.seen, self.seen_stamp
+        seen[start] = seen_stamp
+        count = 1
+        frontier = [start]
+        moves = 1
+        while frontier:
+            moves += 1
+            reached = []
+            for cell in frontier:
+                for neighbour in neighbours(cell):
+                    if seen[neighbour] == seen_stamp or bombs[neighbour] == stamp:
+                        continue
+                    if counts[neighbour]:
+                        if entered[neighbour] - freed_offset <= moves:
+                            return True, count
+                        continue
+                    seen[neighbour] = seen_stamp
+                    count += 1
+                    reached.append(neighbour)
+                    if count >= enough:
+                        return True, count
+            frontier = reached
+        return False, count
+
+    def __call__(self, state):
+        if state.game_over:
+            return None
+        self.track(state)
+        self.update_field(state)
+        head = self.cell(state.head)
+        food = self.target
+        reverse = engine.opposite[state.direction]
+
+        moves = []  # (distance to the apple, not straight on, direction, cell)
+        for direction, cell in zip(names, self.neighbours(head)):
+            if direction == reverse or self.bombs[cell] == self.bomb_stamp or self.moves_until_free(state, cell) > 1:
+                continue
+            if food is None:
+                distance = 0
+            elif self.field[cell] >= self.field_base:
+                distance = self.field[cell] - self.field_base
+            else:
+                distance = self.size + self.wrap_distance(cell, food)
+            moves.append((distance, direction != state.direction, direction, cell))
+        if not moves:
+            return None  # Boxed in; nothing helps
+        moves.sort()
+
+        room = {}
+        for _, _, direction, cell in moves:
+            safe, room[direction] = self.escape(state, cell, 1 if cell == food else 0)
+            if safe:
+                return direction
+
+        following = self.cycle_next(head)
+        for _, _, direction, cell in moves:
+            if cell == following:
+                return direction
+        return max(moves, key=lambda move: room[move[2]])[2]
+
+
+# One step along the cycle described at Autopilot.cycle_next(), for an even
+# number of rows
+def cycle_step(x, y, cols, rows):
+    if y == 0:
+        return (x + 1, 0) if x < cols - 1 else (x, 1)
+    if x == 0:
+        return (0, y - 1)
+    if y % 2:  # Odd rows run right to left down to column 1
+        if x > 1:
+            return (x - 1, y)
+        return (0, y) if y == rows - 1 else (1, y + 1)
+    return (x + 1, y) if x < cols - 1 else (x, y + 1)
+
+
+# Play games headless and report how the bot does and how long it thinks
+#   python autopilot.py --games 20 --board 200x200
+def main():
+    parser = argparse.ArgumentParser(description='Snake Eater autopilot')
+    parser.add_argument('--games', type=int, default=10)
+    parser.add_argument('--board', default=f"{engine.board_cols}x{engine.board_rows}", metavar='COLSxROWS')
+    parser.add_argument('--max-ticks', type=int, default=100000, help='cut each game off after this many moves')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first game; the others follow it')
+    args = parser.parse_args()
+    cols, rows = (int(n) for n in args.board.lower().split('x'))
+
+    for game in range(args.games):
+        state = engine.GameState(cols=cols, rows=rows, seed=args.seed + game)
+        autopilot = Autopilot(cols, rows)
+        slowest = 0.0
+        thinking = 0.0
+        while not state.game_over and state.ticks < args.max_ticks:
+            start = time.perf_counter()
+            direction = autopilot(state)
+            seconds = time.perf_counter() - start
+            thinking += seconds
+            slowest = max(slowest, seconds)
+            state.step(direction)
+        print(f"game {game}: total {state.total_score}, best length {state.best_length}, "
+              f"level {state.best_level}, {state.ticks} moves, "
+              f"{thinking / max(state.ticks, 1) * 1000:.3f} ms/move (slowest {slowest * 1000:.2f})")
+
+
+if __name__ == '__main__':
+    main()
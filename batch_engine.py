@@ -0,0 +1,273 @@
+import time
+
+import numpy as np
+
+import engine
+
+# N independent Snake Eater games stepped together with NumPy. The rules are
+# the ones in engine.GameState; only the layout is different so that one
+# step() call advances every game with a handful of array operations.
+#
+# The snake body is not stored as a list. Every game keeps a per-cell stamp
+# of the move on which the head last entered that cell. With `clock` counting
+# head placements, the snake is exactly the cells whose stamp is greater than
+# clock - length, so self collision, growth and tail removal all come for free.
+# Right after eating, the tail has not caught up with the new length yet; the
+# `grown` flag marks those games so the body on the board is one cell shorter.
+
+# Direction codes; a code XOR 1 is its opposite
+direction_names = ['UP', 'DOWN', 'LEFT', 'RIGHT']
+direction_codes = {name: code for code, name in enumerate(direction_names)}
+direction_dx = np.array([engine.directions[name][0] for name in direction_names], dtype=np.int32)
+direction_dy = np.array([engine.directions[name][1] for name in direction_names], dtype=np.int32)
+NO_ACTION = -1  # Action code for "no key pressed"
+spawn_guesses = 8  # Random guesses per spawn before falling back to a free-cell scan
+
+
+class BatchGame:
+    def __init__(self, n, cols=engine.board_cols, rows=engine.board_rows, lives=engine.initial_lives,
+                 seed=None, auto_reset=False):
+        self.n = n
+        self.cols = cols
+        self.rows = rows
+        self.max_lives = lives
+        self.auto_reset = auto_reset  # Restart finished games at the start of the next step
+        self.rng = np.random.default_rng(seed)
+
+        cells = cols * rows
+        self.cell_base = np.arange(n, dtype=np.int64) * cells  # Offset of each game in the flat grids
+        self.stamp = np.zeros(n * cells, dtype=np.int32)  # Head placement that last entered each cell
+        self.bombs = np.zeros(n * cells, dtype=bool)
+        self.clock = np.zeros(n, dtype=np.int32)  # Head placements so far in each game
+
+        self.head_x = np.zeros(n, dtype=np.int32)
+        self.head_y = np.zeros(n, dtype=np.int32)
+        self.vel_x = np.zeros(n, dtype=np.int32)
+        self.vel_y = np.zeros(n, dtype=np.int32)
+        self.direction = np.zeros(n, dtype=np.int8)
+        self.food_x = np.zeros(n, dtype=np.int32)
+        self.food_y = np.zeros(n, dtype=np.int32)
+        self.length = np.zeros(n, dtype=np.int32)
+        self.grown = np.zeros(n, dtype=bool)
+        self.speed = np.zeros(n, dtype=np.float64)
+        self.score = np.zeros(n, dtype=np.int32)
+        self.total_score = np.zeros(n, dtype=np.int32)
+        self.lives = np.zeros(n, dtype=np.int32)
+        self.level = np.zeros(n, dtype=np.int32)
+        self.ticks = np.zeros(n, dtype=np.int64)
+        self.game_over = np.zeros(n, dtype=bool)
+        self.reset()
+
+    # Start brand new games; `idx` selects which ones (all by default)
+    def reset(self, idx=None):
+        idx = np.arange(self.n) if idx is None else np.asarray(idx)
+        self.lives[idx] = self.max_lives
+        self.level[idx] = 1
+        self.total_score[idx] = 0
+        self.ticks[idx] = 0
+        self.game_over[idx] = False
+        self.new_life(idx)
+
+    # Fresh snake in the middle of the board with one apple and one bomb
+    def new_life(self, idx):
+        cols = self.cols
+        self.speed[idx] = engine.initial_speed
+        self.direction[idx] = direction_codes['UP']
+        self.vel_x[idx] = 0
+        self.vel_y[idx] = 0
+        self.head_x[idx] = cols // 2
+        self.head_y[idx] = self.rows // 2
+        self.length[idx] = 1
+        self.grown[idx] = False
+        self.score[idx] = 0
+        self.clock[idx] += 1
+        self.stamp[self.cell_base[idx] + self.head_y[idx] * cols + self.head_x[idx]] = self.clock[idx]
+        self.bombs.reshape(self.n, -1)[idx] = False
+        self.spawn_food(idx)
+        self.spawn_bombs(idx)
+
+    # Whether cell (x, y) of each game in `idx` is off the snake, the bombs and
+    # the apple, and, with near_head_ok False, away from the head
+    def cell_free(self, idx, x, y, near_head_ok=True):
+        cell = self.cell_base[idx] + y * self.cols + x
+        on_snake = self.stamp[cell] > self.clock[idx] - self.length[idx] + self.grown[idx]
+        on_food = (x == self.food_x[idx]) & (y == self.food_y[idx])
+        free = ~(on_snake | on_food | self.bombs[cell])
+        if not near_head_ok:
+            free &= ((np.abs(x - self.head_x[idx]) >= engine.safe_distance)
+                     | (np.abs(y - self.head_y[idx]) >= engine.safe_distance))
+        return free
+
+    # One random free cell per game in `idx`, as (x, y) arrays with -1 where a
+    # board has no room. A few rounds of vectorized guesses place almost every
+    # game; the rare crowded board left over picks straight from its free cells.
+    def random_free_cells(self, idx, near_head_ok=True):
+        x = np.full(len(idx), -1, dtype=np.int32)
+        y = np.full(len(idx), -1, dtype=np.int32)
+        pending = np.arange(len(idx))
+        for _ in range(spawn_guesses):
+            if not pending.size:
+                return x, y
+            games = idx[pending]
+            guess_x = self.rng.integers(self.cols, size=pending.size)
+            guess_y = self.rng.integers(self.rows, size=pending.size)
+            ok = self.cell_free(games, guess_x, guess_y, near_head_ok)
+            x[pending[ok]] = guess_x[ok]
+            y[pending[ok]] = guess_y[ok]
+            pending = pending[~ok]
+        all_x = np.tile(np.arange(self.cols), self.rows)
+        all_y = np.repeat(np.arange(self.rows), self.cols)
+        for j in pending:
+            games = np.full(all_x.size, idx[j])
+            free = np.flatnonzero(self.cell_free(games, all_x, all_y, near_head_ok))
+            if free.size:
+                pick = self.rng.choice(free)
+                x[j] = all_x[pick]
+                y[j] = all_y[pick]
+        return x, y
+
+    def spawn_food(self, idx):
+        self.food_x[idx] = -1
+        self.food_y[idx] = -1
+        self.food_x[idx], self.food_y[idx] = self.random_free_cells(idx)
+
+    # Add one bomb away from the head to each selected game that has room
+    def spawn_bombs(self, idx):
+        x, y = self.random_free_cells(idx, near_head_ok=False)
+        placed = x >= 0
+        self.bombs[self.cell_base[idx[placed]] + y[placed] * self.cols + x[placed]] = True
+
+    # Advance every running game by one move. `actions` holds one direction
+    # code (or NO_ACTION) per game. Returns a dict mapping each engine event
+    # name to a boolean array saying which games it happened in.
+    def step(self, actions):
+        n = self.n
+        events = {name: np.zeros(n, dtype=bool) for name in
+                  (engine.EAT, engine.LEVEL_UP, engine.HIT_SELF, engine.HIT_BOMB, engine.LIFE_LOST, engine.GAME_OVER)}
+        if self.auto_reset and self.game_over.any():
+            self.reset(np.flatnonzero(self.game_over))
+        idx = np.flatnonzero(~self.game_over)
+        if not idx.size:
+            return events
+
+        # Turn, unless that would reverse the snake
+        action = np.asarray(actions, dtype=np.int8)[idx]
+        turn = (action >= 0) & (action != (self.direction[idx] ^ 1))
+        turned = idx[turn]
+        self.direction[turned] = action[turn]
+        self.vel_x[turned] = direction_dx[action[turn]]
+        self.vel_y[turned] = direction_dy[action[turn]]
+
+        # Move with wrap-around
+        x = (self.head_x[idx] + self.vel_x[idx]) % self.cols
+        y = (self.head_y[idx] + self.vel_y[idx]) % self.rows
+        self.head_x[idx] = x
+        self.head_y[idx] = y
+        self.ticks[idx] += 1
+        self.clock[idx] += 1
+        cell = self.cell_base[idx] + y * self.cols + x
+        hit_self = self.stamp[cell] > self.clock[idx] - self.length[idx]
+        hit_bomb = self.bombs[cell]
+        self.stamp[cell] = self.clock[idx]
+        self.grown[idx] = False
+        dead = hit_self | hit_bomb
+        events[engine.HIT_SELF][idx] = hit_self
+        events[engine.HIT_BOMB][idx] = hit_bomb
+
+        # Eat the apple
+        ate = idx[~dead & (x == self.food_x[idx]) & (y == self.food_y[idx])]
+        if ate.size:
+            events[engine.EAT][ate] = True
+            self.spawn_food(ate)
+            self.length[ate] += 1
+            self.grown[ate] = True
+            self.speed[ate] += engine.speed_increase
+            self.score[ate] += 1
+            level_up = ate[self.length[ate] % engine.level_length == 0]
+            if level_up.size:
+                events[engine.LEVEL_UP][level_up] = True
+                self.level[level_up] += 1
+                self.spawn_bombs(level_up)
+
+        # Lose a life
+        died = idx[dead]
+        if died.size:
+            events[engine.LIFE_LOST][died] = True
+            self.total_score[died] += self.score[died]
+            self.lives[died] -= 1
+            self.level[died] = 1
+            over = self.lives[died] <= 0
+            self.game_over[died[over]] = True
+            events[engine.GAME_OVER][died[over]] = True
+            if not over.all():
+                self.new_life(died[~over])
+        return events
+
+    # Snake of game i as a list of cells, tail first and head last
+    def snake_cells(self, i):
+        stamps = self.stamp.reshape(self.n, -1)[i]
+        body = np.flatnonzero(stamps > self.clock[i] - self.length[i] + self.grown[i])
+        body = body[np.argsort(stamps[body])]
+        return [(int(c % self.cols), int(c // self.cols)) for c in body]
+
+    def obstacle_cells(self, i):
+        return [(int(c % self.cols), int(c // self.cols)) for c in np.flatnonzero(self.bombs.reshape(self.n, -1)[i])]
+
+
+# Copy the apple and bombs of game i into a scalar engine.GameState
+def sync_spawns(batch, i, state):
+    state.food = (int(batch.food_x[i]), int(batch.food_y[i]))
+    state.obstacles = set(batch.obstacle_cells(i))
+    state.food = state.food if state.food[0] >= 0 else None
+    state.rebuild_free()
+
+
+# Step a batch and the same number of scalar engine.GameState games with the
+# same random actions and check they agree after every move. Spawn positions
+# come from different random streams, so they are copied from the batch into
+# the scalar games after each step; everything else is computed independently.
+# Returns a list of (step, game, field) mismatches.
+def compare_with_scalar(n=64, steps=2000, seed=0):
+    batch = BatchGame(n, seed=seed)
+    states = [engine.GameState() for _ in range(n)]
+    for i, state in enumerate(states):
+        sync_spawns(batch, i, state)
+    rng = np.random.default_rng(seed + 1)
+    mismatches = []
+    for t in range(steps):
+        # Head for the apple most of the time so games eat and level up
+        actions = np.where(batch.food_x > batch.head_x, direction_codes['RIGHT'],
+                           np.where(batch.food_x < batch.head_x, direction_codes['LEFT'],
+                                    np.where(batch.food_y > batch.head_y, direction_codes['DOWN'], direction_codes['UP'])))
+        wander = rng.random(n) < 0.2
+        actions[wander] = rng.integers(NO_ACTION, 4, size=wander.sum())
+        batch.step(actions)
+        for i, state in enumerate(states):
+            if not state.game_over:
+                state.step(direction_names[actions[i]] if actions[i] >= 0 else None)
+            for field in ('length', 'score', 'total_score', 'lives', 'level', 'speed', 'game_over'):
+                if getattr(state, field) != getattr(batch, field)[i]:
+                    mismatches.append((t, i, field))
+            # A finished game's last move overlaps itself, which the stamp grid cannot hold
+            if not state.game_over and list(state.snake) != batch.snake_cells(i):
+                mismatches.append((t, i, 'snake'))
+            sync_spawns(batch, i, state)
+    return mismatches
+
+
+# Env-steps per second for a batch of n games taking random actions
+def measure_throughput(n=4096, steps=500, seed=0):
+    batch = BatchGame(n, seed=seed, auto_reset=True)
+    rng = np.random.default_rng(seed + 1)
+    actions = rng.integers(NO_ACTION, 4, size=(steps, n)).astype(np.int8)
+    start = time.perf_counter()
+    for t in range(steps):
+        batch.step(actions[t])
+    return n * steps / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    mismatches = compare_with_scalar()
+    print(f"Scalar check: {len(mismatches)} mismatches")
+    for n in (256, 4096, 16384):
+        print(f"{n} games: {measure_throughput(n):,.0f} env-steps/sec")
@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+import pygame
+
+from sprites import SpriteAtlas, head_angles
+
+# Blit cost of the game's images as loaded from disk against the same images
+# converted to the display format, and of rotating the snake head and tail on
+# every draw (what our_snake() used to do) against looking them up in a
+# SpriteAtlas. Runs on the SDL dummy video driver unless SDL_VIDEODRIVER is set.
+
+blits = 5000
+
+
+def time_blits(dis, image, pos=(0, 0)):
+    start = time.perf_counter()
+    for _ in range(blits):
+        dis.blit(image, pos)
+    return (time.perf_counter() - start) / blits
+
+
+def load(name, size):
+    return pygame.transform.scale(pygame.image.load(os.path.join(root, name)), size)
+
+
+def main():
+    pygame.init()
+    dis = pygame.display.set_mode((600, 440))
+
+    images = [
+        ('grassy_field.png', (600, 400), False),
+        ('apple.png', (20, 20), True),
+        ('bomb.png', (30, 30), True),
+        ('snake_body.png', (10, 10), True),
+    ]
+    print(f"{'image':<18} {'raw us/blit':>12} {'converted us/blit':>18}")
+    for name, size, alpha in images:
+        raw = load(name, size)
+        converted = raw.convert_alpha() if alpha else raw.convert()
+        print(f"{name:<18} {time_blits(dis, raw) * 1e6:>12.2f} {time_blits(dis, converted) * 1e6:>18.2f}")
+
+    head = load('snake_head.png', (10, 10))
+    body = load('snake_body.png', (10, 10))
+    tail = load('snake_tail.png', (10, 10))
+    atlas = SpriteAtlas(head, body, tail)
+    directions = list(head_angles)
+
+    start = time.perf_counter()
+    for i in range(blits):
+        dis.blit(pygame.transform.rotate(head, head_angles[directions[i % 4]]), (0, 0))
+    rotate_time = (time.perf_counter() - start) / blits
+
+    start = time.perf_counter()
+    for i in range(blits):
+        dis.blit(atlas.head(directions[i % 4]), (0, 0))
+    atlas_time = (time.perf_counter() - start) / blits
+
+    print(f"{'snake head':<18} {'rotate+blit':>12} {'atlas blit':>18}")
+    print(f"{'':<18} {rotate_time * 1e6:>12.2f} {atlas_time * 1e6:>18.2f}")
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
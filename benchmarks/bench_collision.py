@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine
+
+# Per-move cost of engine.GameState.step() against snake length, next to the
+# list-scan version of the same move that gameLoop() used to do. The engine
+# should stay flat while the list version grows with the snake.
+#
+# The snake follows a closed loop through every cell of the board, so it can
+# be as long as the board without ever running into itself.
+
+lengths = [1, 10, 100, 500, 1000, 2000, 2400]
+moves = 20000
+
+
+# A closed path through every cell: along the top row, then snaking down and
+# back up through the other rows. Needs an even number of rows.
+def board_cycle(cols, rows):
+    cycle = [(x, 0) for x in range(cols)]
+    for y in range(1, rows):
+        xs = range(cols - 1, 0, -1) if y % 2 else range(1, cols)
+        cycle.extend((x, y) for x in xs)
+    cycle.extend((0, y) for y in range(rows - 1, 0, -1))
+    return cycle
+
+
+# Direction to get from one cell to the next along the cycle
+def cycle_directions(cycle):
+    names = {offset: name for name, offset in engine.directions.items()}
+    return [names[(b[0] - a[0], b[1] - a[1])] for a, b in zip(cycle, cycle[1:] + cycle[:1])]
+
+
+# A game with a snake of `length` lying along the cycle and nothing else on the board
+def long_snake_state(length, cycle):
+    state = engine.GameState()
+    state.snake = engine.Snake(state.cols, state.rows, cycle[:length])
+    state.length = length
+    state.obstacles = set()
+    state.food = None  # No apple, so the snake keeps its length
+    state.rebuild_free()
+    return state
+
+
+def time_engine(length, cycle, turns):
+    state = long_snake_state(length, cycle)
+    i = length - 1
+    start = time.perf_counter()
+    for _ in range(moves):
+        state.step(turns[i % len(cycle)])
+        i += 1
+    assert not state.game_over
+    return (time.perf_counter() - start) / moves
+
+
+# The old gameLoop() move: append, del [0], scan the list and the bombs
+def time_list_scan(length, cycle):
+    snake_list = [list(cell) for cell in cycle[:length]]
+    obstacles = []
+    i = length
+    start = time.perf_counter()
+    for _ in range(moves):
+        snake_head = list(cycle[i % len(cycle)])
+        snake_list.append(snake_head)
+        if len(snake_list) > length:
+            del snake_list[0]
+        for x in snake_list[:-1]:
+            if x == snake_head:
+                raise AssertionError('snake hit itself')
+        for obstacle in obstacles:
+            if snake_head == obstacle:
+                raise AssertionError('snake hit a bomb')
+        i += 1
+    return (time.perf_counter() - start) / moves
+
+
+def main():
+    cycle = board_cycle(engine.board_cols, engine.board_rows)
+    turns = cycle_directions(cycle)
+    print(f"{'length':>8} {'engine us/move':>16} {'list scan us/move':>18}")
+    for length in lengths:
+        engine_time = time_engine(length, cycle, turns)
+        list_time = time_list_scan(length, cycle)
+        print(f"{length:>8} {engine_time * 1e6:>16.2f} {list_time * 1e6:>18.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from snapshot import Snapshot, scenario
+
+# Cost of saving and loading a game with snapshot.py as the snake grows, on
+# the default board and a big one. "take" is the part of an autosave that
+# runs in the game loop; encoding and writing happen on the autosave thread.
+# Loading is what Resume Game waits for.
+
+cases = [(60, 40, 10), (60, 40, 500), (60, 40, 2000), (200, 200, 2000), (1000, 1000, 100000)]
+repeats = 20
+
+
+def best(function):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    print(f"{'board':>10} {'length':>7} {'bytes':>9} {'take ms':>8} {'encode ms':>10} {'write ms':>9} "
+          f"{'load ms':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'game.snksave')
+        for cols, rows, length in cases:
+            state = scenario(length, cols=cols, rows=rows, seed=0)
+            snapshot = Snapshot.take(state)
+            data = snapshot.to_bytes()
+            take = best(lambda: Snapshot.take(state))
+            encode = best(snapshot.to_bytes)
+            write = best(lambda: snapshot.save(path))
+            load = best(lambda: Snapshot.load(path).restore())
+            print(f"{cols:>4}x{rows:<5} {length:>7} {len(data):>9} {take * 1e3:>8.3f} {encode * 1e3:>10.3f} "
+                  f"{write * 1e3:>9.3f} {load * 1e3:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine
+
+# Cost of placing a bomb as the board fills up: engine.GameState.create_obstacle()
+# with the free-cell index, next to the old rejection sampler from gameLoop()
+# that guessed random cells until one was off the snake and the other bombs.
+
+fills = [0.0, 0.5, 0.9, 0.99]
+spawns = 2000
+
+
+# A game whose board is `fill` covered in bombs, with the snake at the centre
+def filled_state(fill, seed=0):
+    state = engine.GameState(seed=seed)
+    rng = random.Random(seed)
+    cells = [(x, y) for x in range(state.cols) for y in range(state.rows) if (x, y) not in state.snake]
+    state.obstacles = set(rng.sample(cells, int(fill * state.cols * state.rows)))
+    state.food = None
+    state.rebuild_free()
+    return state
+
+
+def time_free_index(fill):
+    state = filled_state(fill)
+    start = time.perf_counter()
+    for _ in range(spawns):
+        obs = state.create_obstacle()
+        state.obstacles.discard(obs)  # Put the board back the way it was
+        state.free.release(obs)
+    return (time.perf_counter() - start) / spawns
+
+
+# The old create_obstacle() loop, on the same board as lists
+def time_rejection(fill):
+    state = filled_state(fill)
+    snake_list = [list(cell) for cell in state.snake]
+    obstacles = [list(cell) for cell in state.obstacles]
+    player_position = state.head
+    rng = random.Random(1)
+    tries = 0
+    start = time.perf_counter()
+    for _ in range(spawns):
+        while True:
+            tries += 1
+            obs_x = rng.randrange(state.cols)
+            obs_y = rng.randrange(state.rows)
+            too_close_to_player = (abs(obs_x - player_position[0]) < engine.safe_distance
+                                   and abs(obs_y - player_position[1]) < engine.safe_distance)
+            if not too_close_to_player and [obs_x, obs_y] not in snake_list and [obs_x, obs_y] not in obstacles:
+                break
+    return (time.perf_counter() - start) / spawns, tries / spawns
+
+
+def main():
+    print(f"{'fill':>6} {'free index us':>14} {'rejection us':>13} {'tries':>7}")
+    for fill in fills:
+        index_time = time_free_index(fill)
+        rejection_time, tries = time_rejection(fill)
+        print(f"{fill:>6.0%} {index_time * 1e6:>14.2f} {rejection_time * 1e6:>13.2f} {tries:>7.1f}")
+
+
+if __name__ == '__main__':
+    main()
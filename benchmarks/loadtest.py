@@ -0,0 +1,163 @@
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+import engine
+from server import Client
+
+# Load test for server.py: `rooms` x `players` bot clients on one event loop,
+# each steering for the nearest apple around everything on its copy of the
+# board, and starting again when out of lives. Reports how many updates the
+# bots got, how big they were and how evenly they arrived; the server prints
+# its own tick times (see server.py --report).
+#
+#   python server.py &
+#   python benchmarks/loadtest.py --rooms 200 --players 4 --seconds 30
+# or let the load test start and stop a server itself:
+#   python benchmarks/loadtest.py --spawn --rooms 200 --players 4
+
+
+class Stats:
+    def __init__(self):
+        self.updates = 0
+        self.bytes = 0
+        self.gaps = []  # Seconds between consecutive updates to a bot
+        self.errors = 0
+
+
+# Direction of the move from cell number a to its neighbour b
+def heading(view, a, b):
+    ay, ax = divmod(a, view.cols)
+    by, bx = divmod(b, view.cols)
+    for name, (dx, dy) in engine.directions.items():
+        if (ax + dx) % view.cols == bx and (ay + dy) % view.rows == by:
+            return name
+    return None
+
+
+# Next direction for the bot's snake: towards the nearest apple by
+# wrap-around distance, never onto a snake or a bomb if it can help it
+def choose(view, snake, current):
+    cols, rows = view.cols, view.rows
+    y, x = divmod(snake[-1], cols)
+    best = None
+    for name, (dx, dy) in engine.directions.items():
+        if current is not None and name == engine.opposite[current]:
+            continue
+        cell = (y + dy) % rows * cols + (x + dx) % cols
+        if (view.occupied[cell] and cell != snake[0]) or cell in view.bombs:
+            continue
+        distance = min((min(abs(fx - (x + dx) % cols), cols - abs(fx - (x + dx) % cols)) +
+                        min(abs(fy - (y + dy) % rows), rows - abs(fy - (y + dy) % rows))
+                        for fy, fx in (divmod(food, cols) for food in view.foods)), default=0)
+        if best is None or distance < best[0]:
+            best = (distance, name)
+    return best[1] if best else current
+
+
+async def bot(room, name, host, port, stop_at, stats):
+    try:
+        client = await Client.connect(room, name, host, port)
+    except (OSError, ValueError, asyncio.IncompleteReadError):
+        stats.errors += 1
+        return
+    sent = None  # Last turn sent in the current life
+    current = 'UP'  # Direction the snake is going (a new life starts facing up)
+    lives = None
+    head = None  # Head after the previous update
+    last = time.perf_counter()
+    try:
+        while time.perf_counter() < stop_at:
+            try:
+                await asyncio.wait_for(client.receive(), stop_at - time.perf_counter())
+            except asyncio.TimeoutError:
+                break
+            now = time.perf_counter()
+            stats.updates += 1
+            stats.gaps.append(now - last)
+            last = now
+
+            view = client.view
+            score, total, player_lives, level = view.stats.get(client.player_id, (0, 0, 0, 1))
+            if player_lives != lives:  # A new life (or a new game)
+                lives = player_lives
+                sent = None
+                current = 'UP'
+                head = None
+            if not player_lives:
+                client.restart()
+                continue
+            snake = view.snakes.get(client.player_id)
+            if not snake:
+                continue
+            if len(snake) > 1:
+                current = heading(view, snake[-2], snake[-1])
+            elif head is not None and snake[-1] != head:
+                current = heading(view, head, snake[-1])
+            head = snake[-1]
+            direction = choose(view, snake, current)
+            if direction is not None and direction != sent:
+                client.turn(direction)
+                sent = direction
+    except (OSError, ValueError, asyncio.IncompleteReadError):
+        stats.errors += 1
+    finally:
+        stats.bytes += client.bytes_received
+        await client.close()
+
+
+async def run(args):
+    stats = Stats()
+    stop_at = time.perf_counter() + args.seconds
+    bots = []
+    for room in range(args.rooms):
+        for player in range(args.players):
+            bots.append(asyncio.create_task(bot(f"room{room}", f"bot{room}-{player}", args.host, args.port,
+                                                stop_at, stats)))
+        await asyncio.sleep(0)  # Let the connections so far get going
+    await asyncio.gather(*bots)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test for the Snake Eater multiplayer server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--rooms', type=int, default=100)
+    parser.add_argument('--players', type=int, default=4, help='bots per room')
+    parser.add_argument('--seconds', type=float, default=20.0)
+    parser.add_argument('--spawn', action='store_true', help='start server.py for the test and stop it afterwards')
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        server = subprocess.Popen([sys.executable, os.path.join(root, 'server.py'),
+                                   '--host', args.host, '--port', str(args.port)])
+        time.sleep(1.0)
+    try:
+        start = time.perf_counter()
+        stats = asyncio.run(run(args))
+        elapsed = time.perf_counter() - start
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    bots = args.rooms * args.players
+    gaps = sorted(stats.gaps) or [0.0]
+    print(f"{bots} bots in {args.rooms} rooms, {stats.errors} errors")
+    print(f"{stats.updates} updates, {stats.updates / elapsed:.0f}/sec, "
+          f"{stats.bytes / max(stats.updates, 1):.1f} bytes each, {stats.bytes / elapsed / 1024:.0f} KiB/s in")
+    print(f"gap between updates: p50 {statistics.median(gaps) * 1000:.1f} ms, "
+          f"p99 {gaps[int((len(gaps) - 1) * 0.99)] * 1000:.1f} ms, max {gaps[-1] * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(root))
+
+import pygame
+
+import engine
+from bench_collision import board_cycle, cycle_directions, long_snake_state
+from leaderboard import Leaderboard
+from renderer import GameRenderer
+from sprites import SpriteAtlas
+from text_cache import TextCache
+
+# The game's hot paths at scale, written as JSON so runs on different commits
+# can be compared:
+#   step            engine.GameState.step() against snake length
+#   spawn           create_obstacle() against the number of bombs on the board
+#   draw_snake      drawing the whole snake (our_snake) against length
+#   draw_obstacles  drawing every bomb into the static layer (draw_obstacles) against bomb count
+#   redraw          redrawing the whole view (renderer.present() after invalidate()) against bomb count
+#   frame           one move plus renderer.present() against snake length
+#   update_scores   adding a score and reading the top 10 against table size
+# Every case is timed `repeats` times with fixed seeds and reports the
+# median and best time per operation in microseconds, and the median as
+# operations per second (ticks per second for step). Rendering runs on the
+# SDL dummy video driver unless SDL_VIDEODRIVER is set.
+#
+#   python benchmarks/suite.py --out before.json
+#   python benchmarks/suite.py --out after.json --compare before.json
+
+board_cells = engine.board_cols * engine.board_rows
+lengths = [1, 10, 100, 500, 1000, 2000, 2400]
+bomb_counts = [0, 10, 100, 500, 1000, 2000, board_cells - engine.safe_distance ** 2 * 4]
+table_sizes = [0, 1000, 100000]
+
+
+# A game whose board has `count` bombs on random cells, with the snake at the centre
+def bombed_state(count, seed=0):
+    state = engine.GameState(seed=seed)
+    rng = random.Random(seed)
+    cells = [(x, y) for y in range(state.rows) for x in range(state.cols)
+             if abs(x - state.head[0]) >= engine.safe_distance or abs(y - state.head[1]) >= engine.safe_distance]
+    state.obstacles = set(rng.sample(cells, count))
+    state.food = None
+    state.rebuild_free()
+    return state
+
+
+def time_step(length, moves):
+    cycle = board_cycle(engine.board_cols, engine.board_rows)
+    turns = cycle_directions(cycle)
+    state = long_snake_state(length, cycle)
+    i = length - 1
+    start = time.perf_counter()
+    for _ in range(moves):
+        state.step(turns[i % len(cycle)])
+        i += 1
+    elapsed = time.perf_counter() - start
+    assert not state.game_over
+    return elapsed / moves
+
+
+def time_spawn(bombs, spawns):
+    state = bombed_state(bombs)
+    start = time.perf_counter()
+    for _ in range(spawns):
+        obs = state.create_obstacle()
+        if obs is not None:
+            state.obstacles.discard(obs)  # Put the board back the way it was
+            state.free.release(obs)
+    return (time.perf_counter() - start) / spawns
+
+
+def time_draw_snake(renderer, length, draws):
+    state = long_snake_state(length, board_cycle(engine.board_cols, engine.board_rows))
+    start = time.perf_counter()
+    for _ in range(draws):
+        renderer.draw_snake(state.snake, state.direction)
+    return (time.perf_counter() - start) / draws
+
+
+def time_draw_obstacles(renderer, bombs, draws):
+    state = bombed_state(bombs)
+    start = time.perf_counter()
+    for _ in range(draws):
+        renderer.draw_obstacles(state.obstacles)
+    return (time.perf_counter() - start) / draws
+
+
+def time_redraw(renderer, bombs, draws):
+    state = bombed_state(bombs)
+    renderer.present(state)
+    start = time.perf_counter()
+    for _ in range(draws):
+        renderer.invalidate()
+        renderer.present(state)
+    return (time.perf_counter() - start) / draws
+
+
+def time_frame(renderer, length, frames):
+    cycle = board_cycle(engine.board_cols, engine.board_rows)
+    turns = cycle_directions(cycle)
+    state = long_snake_state(length, cycle)
+    renderer.invalidate()
+    renderer.present(state)
+    i = length - 1
+    start = time.perf_counter()
+    for _ in range(frames):
+        state.step(turns[i % len(cycle)])
+        renderer.note_move(state)
+        renderer.present(state)
+        i += 1
+    return (time.perf_counter() - start) / frames
+
+
+def time_update_scores(rows, updates):
+    with tempfile.TemporaryDirectory() as directory:
+        leaderboard = Leaderboard(os.path.join(directory, 'scores.db'))
+        rng = random.Random(0)
+        with leaderboard.transaction() as db:
+            db.executemany("INSERT INTO scores (score, created) VALUES (?, 0)",
+                           [(rng.randrange(1000),) for _ in range(rows)])
+        start = time.perf_counter()
+        for _ in range(updates):
+            leaderboard.add(rng.randrange(1000), 1, 1)
+            leaderboard.top(10)
+        elapsed = time.perf_counter() - start
+        leaderboard.close()
+    return elapsed / updates
+
+
+def load_image(name, size, alpha=True):
+    image = pygame.transform.scale(pygame.image.load(os.path.join(os.path.dirname(root), name)), size)
+    return image.convert_alpha() if alpha else image.convert()
+
+
+# The game's renderer on a window of the game's size
+def make_renderer():
+    pygame.init()
+    surface = pygame.display.set_mode((600, 440))
+    sprites = SpriteAtlas(load_image('snake_head.png', (10, 10)), load_image('snake_body.png', (10, 10)),
+                          load_image('snake_tail.png', (10, 10)))
+    return GameRenderer(surface, 10, 40, load_image('grassy_field.png', (600, 400), False),
+                        load_image('apple.png', (20, 20)), load_image('bomb.png', (30, 30)), sprites,
+                        TextCache(), pygame.font.SysFont('roboto', 30), (204, 204, 0), (0, 0, 0))
+
+
+# (name, parameter name, values, function(value, count), operations per repeat)
+def cases(renderer, quick):
+    scale = 10 if quick else 1
+    return [
+        ('step', 'length', lengths, time_step, 20000 // scale),
+        ('spawn', 'bombs', bomb_counts, time_spawn, 2000 // scale),
+        ('draw_snake', 'length', lengths, lambda n, count: time_draw_snake(renderer, n, count), 50 // scale),
+        ('draw_obstacles', 'bombs', bomb_counts, lambda n, count: time_draw_obstacles(renderer, n, count),
+         50 // scale),
+        ('redraw', 'bombs', bomb_counts, lambda n, count: time_redraw(renderer, n, count), 200 // scale),
+        ('frame', 'length', lengths, lambda n, count: time_frame(renderer, n, count), 2000 // scale),
+        ('update_scores', 'rows', table_sizes if not quick else table_sizes[:2], time_update_scores, 200 // scale),
+    ]
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(repeats, quick, only=None):
+    renderer = make_renderer()
+    results = []
+    for name, param, values, function, count in cases(renderer, quick):
+        if only and name not in only:
+            continue
+        for value in values:
+            times = [function(value, count) * 1e6 for _ in range(repeats)]
+            result = {'name': name, param: value, 'median_us': round(statistics.median(times), 3),
+                      'min_us': round(min(times), 3), 'per_sec': round(1e6 / statistics.median(times)),
+                      'ops': count, 'repeats': repeats}
+            results.append(result)
+            print(f"{name:<15} {param}={value:<6} {result['median_us']:>12.2f} us (best {result['min_us']:.2f})",
+                  file=sys.stderr)
+    pygame.quit()
+    return {
+        'commit': git_commit(),
+        'created': time.time(),
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'platform': platform.platform(),
+        'video_driver': os.environ.get('SDL_VIDEODRIVER'),
+        'results': results,
+    }
+
+
+# Timings and counts in a result; everything else identifies the case
+measured = ('median_us', 'min_us', 'per_sec', 'ops', 'repeats')
+
+
+def case_key(result):
+    return tuple(sorted((k, v) for k, v in result.items() if k not in measured))
+
+
+# Print new/old median for every case both runs have
+def compare(old, new):
+    old_results = {case_key(result): result for result in old['results']}
+    print(f"{'case':<32} {'old us':>10} {'new us':>10} {'new/old':>8}")
+    for result in new['results']:
+        before = old_results.get(case_key(result))
+        if before is None:
+            continue
+        label = ' '.join(f"{k}={v}" for k, v in case_key(result) if k != 'name')
+        ratio = result['median_us'] / before['median_us'] if before['median_us'] else float('inf')
+        print(f"{result['name'] + ' ' + label:<32} {before['median_us']:>10.2f} {result['median_us']:>10.2f} "
+              f"{ratio:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Snake Eater benchmark suite')
+    parser.add_argument('--out', metavar='FILE', help='write the results as JSON to FILE (default: stdout)')
+    parser.add_argument('--repeats', type=int, default=5, help='times to run each case (default 5)')
+    parser.add_argument('--quick', action='store_true', help='a tenth of the operations per case, for a smoke test')
+    parser.add_argument('--only', nargs='+', metavar='CASE', help='only run these cases')
+    parser.add_argument('--compare', metavar='FILE', help='print the change against an earlier results file')
+    args = parser.parse_args()
+
+    results = run(args.repeats, args.quick, args.only)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=1)
+    else:
+        json.dump(results, sys.stdout, indent=1)
+        print()
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import pygame
+
+# Records the frames the game presents without slowing the game down. The
+# main loop calls frame() after each display update, which only blits the
+# display into a free slot of a fixed pool of shared memory buffers and
+# tells a writer process which slot to save. The writer (this file run as a
+# script) scales the frame if asked to, writes it out and hands the slot
+# back. When the writer falls behind and no slot is free, the frame is
+# dropped and counted instead of waiting. Encoding happens in a separate
+# process because pygame holds the GIL while it writes a PNG, which would
+# stall the game's frames even from a background thread.
+#
+# Output goes to a directory:
+#   png  frame-000000.png, frame-000001.png, ...
+#   raw  frames.rgb, every frame as packed RGB24 one after another, plus
+#        frames.json with the size and frame rate, so for example
+#          ffmpeg -f rawvideo -pix_fmt rgb24 -s 600x440 -r 60 -i frames.rgb out.mp4
+# Raw is much cheaper to write than PNG, so it drops fewer frames.
+
+
+class FrameCapture:
+    def __init__(self, surface, directory, format='png', scale=1.0, pool_size=8, every=1, fps=60):
+        if format not in ('png', 'raw'):
+            raise ValueError(f"unknown capture format {format}")
+        if every < 1:
+            raise ValueError(f"can only keep every n-th frame for n of 1 or more, not {every}")
+        self.surface = surface
+        self.directory = directory
+        self.size = surface.get_size()
+        self.every = every  # Keep every n-th frame
+        self.memory = [shared_memory.SharedMemory(create=True, size=self.size[0] * self.size[1] * 4)
+                       for _ in range(pool_size)]
+        self.slots = [pygame.image.frombuffer(memory.buf, self.size, 'RGBX') for memory in self.memory]
+        self.free = queue.Queue()  # Slots the writer is done with
+        for slot in range(pool_size):
+            self.free.put(slot)
+        self.frames_seen = 0
+        self.captured = 0  # Frames handed to the writer
+        self.dropped = 0  # Frames skipped because no slot was free
+        self.written = 0
+        self.paused = False
+        self.closed = False
+
+        os.makedirs(directory, exist_ok=True)
+        settings = {'memory': [memory.name for memory in self.memory], 'size': self.size, 'format': format,
+                    'output_size': (max(1, round(self.size[0] * scale)), max(1, round(self.size[1] * scale))),
+                    'fps': fps / every, 'directory': directory}
+        self.writer = subprocess.Popen([sys.executable, os.path.abspath(__file__), json.dumps(settings)],
+                                       stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                       env=dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='1'))
+        self.reader = threading.Thread(target=self.read_finished, name='capture-reader', daemon=True)
+        self.reader.start()
+
+    # The writer prints each slot number once the frame in it is saved
+    def read_finished(self):
+        for line in self.writer.stdout:
+            self.written += 1
+            self.free.put(int(line))
+
+    # Copy the current display into a free slot for the writer. Call it right
+    # after the display is updated.
+    def frame(self):
+        if self.paused or self.closed:
+            return
+        self.frames_seen += 1
+        if (self.frames_seen - 1) % self.every:
+            return
+        try:
+            slot = self.free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return
+        self.slots[slot].blit(self.surface, (0, 0))
+        try:
+            self.writer.stdin.write(f"{slot} {self.captured}\n".encode())
+            self.writer.stdin.flush()
+        except OSError:
+            self.closed = True  # The writer died; the game carries on without it
+            return
+        self.captured += 1
+
+    # Wait for the writer to save the frames it has, then free the buffers.
+    # Returns the report line.
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            try:
+                self.writer.stdin.close()
+            except OSError:
+                pass
+        self.writer.wait()
+        self.reader.join()
+        self.slots = []
+        for memory in self.memory:
+            memory.close()
+            memory.unlink()
+        self.memory = []
+        return self.report()
+
+    def report(self):
+        line = (f"capture: {self.captured} frames captured, {self.dropped} dropped, {self.written} written "
+                f"to {self.directory}")
+        if self.writer.returncode:
+            line += f" (writer exited with {self.writer.returncode})"
+        return line
+
+
+# Session directory under `root` named after the current time
+def session_directory(root):
+    return os.path.join(root, time.strftime('%Y%m%d-%H%M%S'))
+
+
+# The writer process: reads "slot frame-number" lines until stdin closes
+def run_writer(settings):
+    memory = []
+    for name in settings['memory']:
+        memory.append(shared_memory.SharedMemory(name))
+        # Attaching registers the block with this process's resource tracker,
+        # which would unlink it when the writer exits; the game owns it
+        resource_tracker.unregister(memory[-1]._name, 'shared_memory')
+    size, output_size = tuple(settings['size']), tuple(settings['output_size'])
+    frames = [pygame.image.frombuffer(block.buf, size, 'RGBX') for block in memory]
+    raw = open(os.path.join(settings['directory'], 'frames.rgb'), 'wb') if settings['format'] == 'raw' else None
+    written = 0
+    image = None
+    for line in sys.stdin:
+        slot, number = (int(n) for n in line.split())
+        image = frames[slot]
+        if output_size != size:
+            image = pygame.transform.smoothscale(image, output_size)
+        if raw is None:
+            pygame.image.save(image, os.path.join(settings['directory'], f"frame-{number:06d}.png"))
+        else:
+            raw.write(pygame.image.tobytes(image, 'RGB'))
+        written += 1
+        print(slot, flush=True)
+    if raw is not None:
+        raw.close()
+        with open(os.path.join(settings['directory'], 'frames.json'), 'w') as f:
+            json.dump({'width': output_size[0], 'height': output_size[1], 'pixel_format': 'rgb24',
+                       'fps': settings['fps'], 'frames': written}, f, indent=1)
+    frames = image = None  # Let go of the buffers before closing them
+    for block in memory:
+        block.close()
+
+
+if __name__ == '__main__':
+    run_writer(json.loads(sys.argv[1]))
@@ -0,0 +1,315 @@
+import random
+from array import array
+from collections import deque
+
+# Headless Snake Eater rules. Nothing in here touches pygame, so the same
+# game can be driven by the window in SnakeEater.py, by a bot, or by a
+# simulation running thousands of games per second.
+#
+# Positions are (x, y) grid cells, not pixels: the 600x400 field with
+# 10-pixel blocks is a 60x40 board.
+
+# Board size in cells
+board_cols = 60
+board_rows = 40
+
+# Rule settings
+initial_speed = 15  # Moves per second at the start of each life
+speed_increase = 0.5  # Added to the speed for every apple eaten
+initial_lives = 3  # Lives at the start of a game
+level_length = 5  # Level goes up every time the length is a multiple of this
+safe_distance = 3  # Bombs never spawn within this many cells of the head
+
+# Direction name -> (dx, dy) in cells
+directions = {
+    'UP': (0, -1),
+    'DOWN': (0, 1),
+    'LEFT': (-1, 0),
+    'RIGHT': (1, 0),
+}
+
+# Direction the snake is not allowed to reverse into
+opposite = {
+    'UP': 'DOWN',
+    'DOWN': 'UP',
+    'LEFT': 'RIGHT',
+    'RIGHT': 'LEFT',
+}
+
+# Events returned by GameState.step()
+EAT = 'eat'
+LEVEL_UP = 'level_up'
+HIT_SELF = 'hit_self'
+HIT_BOMB = 'hit_bomb'
+LIFE_LOST = 'life_lost'
+GAME_OVER = 'game_over'
+
+
+# The snake's body, tail first and head last, plus a grid counting how many
+# segments sit on each cell. Growth, tail removal and "is this cell on the
+# snake" are all constant time no matter how long the snake gets.
+class Snake:
+    def __init__(self, cols, rows, cells=(), counts=None):
+        self.cols = cols
+        self.rows = rows
+        self.body = deque()
+        self.counts = bytearray(cols * rows) if counts is None else counts
+        for cell in cells:
+            self.add_head(cell)
+
+    def __len__(self):
+        return len(self.body)
+
+    def __iter__(self):
+        return iter(self.body)
+
+    # Indexing is constant time at both ends (head, tail, next-to-tail)
+    def __getitem__(self, i):
+        return self.body[i]
+
+    def __contains__(self, cell):
+        return self.counts[cell[1] * self.cols + cell[0]] > 0
+
+    # Number of segments on a cell (2 or more means the snake overlaps itself)
+    def count(self, cell):
+        return self.counts[cell[1] * self.cols + cell[0]]
+
+    @property
+    def head(self):
+        return self.body[-1]
+
+    @property
+    def tail(self):
+        return self.body[0]
+
+    def add_head(self, cell):
+        self.body.append(cell)
+        self.counts[cell[1] * self.cols + cell[0]] += 1
+
+    def remove_tail(self):
+        cell = self.body.popleft()
+        self.counts[cell[1] * self.cols + cell[0]] -= 1
+        return cell
+
+    # A new Snake on `cells` that takes over this one's grid, leaving this one
+    # empty. Only the old body's cells need clearing, so it costs the old
+    # length rather than the board size; being a new object, it still tells
+    # anyone who remembers the snake that a new life started.
+    def renew(self, cells):
+        for x, y in self.body:
+            self.counts[y * self.cols + x] = 0
+        self.body.clear()
+        return Snake(self.cols, self.rows, cells, counts=self.counts)
+
+
+# Every cell that is not under the snake, a bomb or the apple, kept as an
+# array of cell numbers plus each cell's position in that array. Taking a cell
+# swaps the last entry into its slot, so taking, releasing and picking a random
+# free cell are all constant time however full the board is. Both are int
+# arrays rather than lists so a 1000x1000 arena takes 8 MB, not 80.
+class FreeCells:
+    def __init__(self, cols, rows):
+        self.cols = cols
+        self.cells = array('i', range(cols * rows))
+        self.pos = array('i', range(cols * rows))  # Index into self.cells, or -1 if taken
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, cell):
+        return self.pos[cell[1] * self.cols + cell[0]] >= 0
+
+    def take(self, cell):
+        number = cell[1] * self.cols + cell[0]
+        i = self.pos[number]
+        if i < 0:
+            return  # Already taken
+        last = self.cells.pop()
+        if last != number:
+            self.cells[i] = last
+            self.pos[last] = i
+        self.pos[number] = -1
+
+    def release(self, cell):
+        number = cell[1] * self.cols + cell[0]
+        if self.pos[number] >= 0:
+            return  # Already free
+        self.pos[number] = len(self.cells)
+        self.cells.append(number)
+
+    # A random free cell, or None when the board is full
+    def choice(self, rng):
+        if not self.cells:
+            return None
+        number = self.cells[rng.randrange(len(self.cells))]
+        return (number % self.cols, number // self.cols)
+
+
+class GameState:
+    def __init__(self, cols=board_cols, rows=board_rows, lives=initial_lives, seed=None):
+        self.cols = cols
+        self.rows = rows
+        self.max_lives = lives
+        self.rng = random.Random(seed)
+        self.reset()
+
+    # Start a brand new game (all lives, level 1, no score). Passing a seed
+    # makes the new game's apples and bombs repeatable: the free-cell index
+    # starts over too, as its order decides which cell a pick lands on.
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng.seed(seed)
+        self.snake = None
+        self.lives = self.max_lives
+        self.level = 1
+        self.total_score = 0
+        self.game_over = False
+        self.ticks = 0
+        self.best_level = 1  # Highest level and length reached in any life
+        self.best_length = 1
+        self.new_life()
+
+    # Put a fresh snake in the middle of the board with one bomb and one apple.
+    # Later lives of a game reuse the snake grid and free-cell index: the old
+    # snake, bombs and apple are handed back, which costs their size rather
+    # than the board's.
+    def new_life(self):
+        self.speed = initial_speed
+        self.direction = 'UP'
+        self.velocity = (0, 0)  # The snake stays still until the first key press
+        start = (self.cols // 2, self.rows // 2)
+        if self.snake is None:
+            self.snake = Snake(self.cols, self.rows, [start])
+            self.free = FreeCells(self.cols, self.rows)
+        else:
+            for cell in self.snake:
+                self.free.release(cell)
+            for cell in self.obstacles:
+                self.free.release(cell)
+            if self.food is not None:
+                self.free.release(self.food)
+            self.snake = self.snake.renew([start])
+        self.free.take(start)
+        self.length = 1
+        self.score = 0
+        self.obstacles = set()
+        self.last_obstacle = None  # Newest bomb, so a renderer can draw just that one
+        self.spawn_food()
+        self.create_obstacle()
+
+    # Rebuild the free-cell index after the snake, bombs or apple were set directly
+    def rebuild_free(self):
+        self.free = FreeCells(self.cols, self.rows)
+        for cell in self.snake:
+            self.free.take(cell)
+        for cell in self.obstacles:
+            self.free.take(cell)
+        if self.food is not None:
+            self.free.take(self.food)
+
+    @property
+    def head(self):
+        return self.snake.head
+
+    # Put the apple on a random free cell (None once the board is full)
+    def spawn_food(self):
+        self.food = self.free.choice(self.rng)
+        if self.food is not None:
+            self.free.take(self.food)
+
+    # Add one bomb on a random free cell away from the head. If the first pick
+    # lands near the head, the free cells around the head are taken out of the
+    # index for a second pick, so there is never an open-ended retry loop.
+    # Returns the new bomb, or None if there was no room.
+    def create_obstacle(self):
+        head_x, head_y = self.head
+        obs = self.free.choice(self.rng)
+        if obs is not None and abs(obs[0] - head_x) < safe_distance and abs(obs[1] - head_y) < safe_distance:
+            near_head = []
+            for y in range(max(head_y - safe_distance + 1, 0), min(head_y + safe_distance, self.rows)):
+                for x in range(max(head_x - safe_distance + 1, 0), min(head_x + safe_distance, self.cols)):
+                    if (x, y) in self.free:
+                        near_head.append((x, y))
+                        self.free.take((x, y))
+            obs = self.free.choice(self.rng)
+            for cell in near_head:
+                self.free.release(cell)
+        if obs is not None:
+            self.free.take(obs)
+            self.obstacles.add(obs)
+            self.last_obstacle = obs
+        return obs
+
+    # Change direction unless it would reverse the snake onto itself. Returns
+    # True if that changed anything: a new direction, or the first move of a
+    # life (going the way the snake already faces is not a change otherwise).
+    def turn(self, direction):
+        if direction not in directions or direction == opposite[self.direction]:
+            return False
+        if direction == self.direction and self.velocity != (0, 0):
+            return False
+        self.direction = direction
+        self.velocity = directions[direction]
+        return True
+
+    # Advance the game by one move. `action` is an optional direction name
+    # applied before moving. Returns the list of events that happened.
+    def step(self, action=None):
+        events = []
+        if self.game_over:
+            return events
+        if action is not None:
+            self.turn(action)
+        self.ticks += 1
+
+        head_x, head_y = self.head
+        new_head = ((head_x + self.velocity[0]) % self.cols, (head_y + self.velocity[1]) % self.rows)
+        self.snake.add_head(new_head)
+        self.free.take(new_head)
+        if len(self.snake) > self.length:
+            tail = self.snake.remove_tail()  # Remove the tail segment when the snake moves
+            if tail not in self.snake:
+                self.free.release(tail)
+
+        if self.snake.count(new_head) > 1:
+            events.append(HIT_SELF)
+        if new_head in self.obstacles:
+            events.append(HIT_BOMB)
+        if events:
+            self.lose_life(events)
+            return events
+
+        if new_head == self.food:
+            self.spawn_food()
+            self.length += 1
+            self.speed += speed_increase
+            self.score += 1
+            self.best_length = max(self.best_length, self.length)
+            events.append(EAT)
+            if self.length % level_length == 0:
+                self.level += 1
+                self.best_level = max(self.best_level, self.level)
+                self.create_obstacle()
+                events.append(LEVEL_UP)
+        return events
+
+    def lose_life(self, events):
+        self.total_score += self.score
+        self.lives -= 1
+        self.level = 1
+        events.append(LIFE_LOST)
+        if self.lives <= 0:
+            self.game_over = True
+            events.append(GAME_OVER)
+        else:
+            self.new_life()
+
+
+# Play one game to the end with `policy(state) -> direction or None` choosing
+# each move. Returns the finished state. Games that never end (a policy that
+# never presses a key) are cut off after `max_ticks` moves.
+def play(policy, seed=None, max_ticks=100000, **kwargs):
+    state = GameState(seed=seed, **kwargs)
+    while not state.game_over and state.ticks < max_ticks:
+        state.step(policy(state))
+    return state
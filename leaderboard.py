@@ -0,0 +1,123 @@
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+# High scores kept in an SQLite database in WAL mode. Every score is one
+# INSERT, which SQLite commits atomically, so several game instances sharing
+# the file cannot lose each other's scores and a crash mid-write cannot
+# corrupt it. The top of the table is cached in memory and only read again
+# when this process or another one has written to the database since.
+#
+# Each entry can carry when it was set, the level reached and the snake's
+# length. A scores.txt from older versions is imported the first time the
+# database is created. Creating the table, importing and stamping
+# PRAGMA user_version all happen in one BEGIN IMMEDIATE transaction, so when
+# two instances start at once only the first imports and the other sees the
+# stamp.
+#
+# Every compact_every-th row id also trims the table back to the best
+# keep_scores entries.
+
+schema_version = 1  # PRAGMA user_version of a set-up database
+compact_every = 100
+keep_scores = 1000
+
+
+class Leaderboard:
+    def __init__(self, path, legacy_file=None):
+        self.path = path
+        self.db = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.cache = None  # (data_version, k, rows) of the last top() query
+        with self.transaction():
+            if self.db.execute("PRAGMA user_version").fetchone()[0] < schema_version:
+                self.set_up(legacy_file)
+
+    # Create the table and import scores.txt into a new database. A database
+    # from before user_version was stamped already has its scores table and
+    # is only stamped.
+    def set_up(self, legacy_file):
+        existed = self.db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'scores'").fetchone()
+        self.db.execute("""CREATE TABLE IF NOT EXISTS scores (
+                               id INTEGER PRIMARY KEY,
+                               score INTEGER NOT NULL,
+                               created REAL NOT NULL,
+                               level INTEGER,
+                               length INTEGER)""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS scores_by_score ON scores (score DESC, id)")
+        if not existed and legacy_file is not None and os.path.exists(legacy_file):
+            self.db.executemany("INSERT INTO scores (score, created) VALUES (?, ?)", read_text_file(legacy_file))
+        self.db.execute(f"PRAGMA user_version = {schema_version}")
+
+    # Add one score. Returns its row id.
+    def add(self, score, level=None, length=None, created=None):
+        created = time.time() if created is None else created
+        cursor = self.db.execute("INSERT INTO scores (score, created, level, length) VALUES (?, ?, ?, ?)",
+                                 (score, created, level, length))
+        self.cache = None
+        if cursor.lastrowid % compact_every == 0:
+            self.compact()
+        return cursor.lastrowid
+
+    # Highest k entries as dicts with score, created, level and length.
+    # Served from memory unless the database changed since the last call.
+    def top(self, k=10):
+        version = self.db.execute("PRAGMA data_version").fetchone()[0]
+        if self.cache is not None and self.cache[0] == version and self.cache[1] >= k:
+            return self.cache[2][:k]
+        rows = self.db.execute("SELECT score, created, level, length FROM scores ORDER BY score DESC, id LIMIT ?",
+                               (k,)).fetchall()
+        entries = [{'score': score, 'created': created, 'level': level, 'length': length}
+                   for score, created, level, length in rows]
+        self.cache = (version, k, entries)
+        return entries
+
+    # Replace every entry with the given scores (None entries are skipped)
+    def replace(self, scores):
+        now = time.time()
+        with self.transaction():
+            self.db.execute("DELETE FROM scores")
+            self.db.executemany("INSERT INTO scores (score, created) VALUES (?, ?)",
+                                [(score, now) for score in scores if score is not None])
+        self.cache = None
+
+    def clear(self):
+        self.replace([])
+
+    # Keep only the best `keep` entries so the file stays small
+    def compact(self, keep=keep_scores):
+        with self.transaction():
+            self.db.execute("""DELETE FROM scores WHERE id NOT IN
+                                   (SELECT id FROM scores ORDER BY score DESC, id LIMIT ?)""", (keep,))
+        self.cache = None
+
+    # Import a scores.txt (one score per line, blank lines for empty spots)
+    def import_text_file(self, path):
+        with self.transaction():
+            self.db.executemany("INSERT INTO scores (score, created) VALUES (?, ?)", read_text_file(path))
+        self.cache = None
+
+    # BEGIN IMMEDIATE takes the write lock up front, so a multi-statement
+    # change is never interleaved with another writer's
+    @contextmanager
+    def transaction(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.db
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        self.db.execute("COMMIT")
+
+    def close(self):
+        self.db.close()
+
+
+# (score, created) rows for a scores.txt, dated by the file's modification time
+def read_text_file(path):
+    with open(path, "r") as file:
+        scores = [int(line.strip()) for line in file if line.strip().isdigit()]
+    created = os.path.getmtime(path)
+    return [(score, created) for score in scores]
@@ -0,0 +1,287 @@
+import argparse
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import engine
+from recording import code_directions, direction_codes
+
+# The board published into shared memory every tick, for agents running in
+# other processes. The game writes one uint8 code per cell plus a small
+# header; an agent maps the same block and reads it as NumPy arrays without
+# any copying or pickling, and writes its next direction back into the
+# header. Nothing is locked: the header holds a sequence counter that the
+# game makes odd while it writes and even once the tick is complete, so a
+# reader that sees the same even value before and after reading knows it got
+# a whole tick (a seqlock). This relies on the stores becoming visible in the
+# order they are made, which x86 guarantees.
+#
+# Layout (little-endian):
+#   0   b'SNKO', format version (u32)
+#   8   sequence (u64)
+#   16  cols, rows (u32)
+#   24  ticks (u64)
+#   32  score, total score, lives, level, length (u32), direction code (u8), game over (u8)
+#   64  action sequence (u64), sequence of the tick the action answers (u64),
+#       direction code (u8)
+#   128 the grid, rows x cols cell codes
+# The game is the only writer of 0-63 and the grid, the agent of 64-127.
+#
+#   python observation.py host snake-obs --ticks 100000 &
+#   python observation.py agent snake-obs
+
+magic = b'SNKO'
+format_version = 2
+header_size = 128
+state_format = '<QIIQIIIIIBB'  # Sequence through game over, at offset 8
+action_format = '<QQB'  # At offset 64
+
+# Cell codes
+EMPTY = 0
+HEAD = 1
+BODY = 2
+TAIL = 3
+APPLE = 4
+BOMB = 5
+
+
+class ObservationPublisher:
+    # Creates the shared memory block; `name` None lets the OS pick one
+    def __init__(self, cols, rows, name=None):
+        self.cols = cols
+        self.rows = rows
+        self.memory = shared_memory.SharedMemory(name, create=True, size=header_size + cols * rows)
+        self.buffer = self.memory.buf
+        self.grid = self.buffer[header_size:header_size + cols * rows]
+        self.buffer[:8] = magic + struct.pack('<I', format_version)
+        self.sequence = 0
+        self.action_sequence = 0  # Last action taken
+        self.snake = None  # What the grid shows: the snake object, tick, ends, apple and bomb count
+        self.ticks = None
+        self.head = self.tail = self.food = None
+        self.bomb_count = 0
+        self.write_header(None)
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    def write_header(self, state):
+        if state is None:
+            values = (0,) * 8
+        else:
+            values = (state.ticks, state.score, state.total_score, state.lives, state.level, state.length,
+                      direction_codes[state.direction], state.game_over)
+        struct.pack_into(state_format, self.buffer, 8, self.sequence, self.cols, self.rows, *values)
+
+    def code(self, state, cell):
+        snake = state.snake
+        if snake.count(cell):
+            return HEAD if cell == snake.head else TAIL if cell == snake.tail else BODY
+        if cell == state.food:
+            return APPLE
+        if cell in state.obstacles:
+            return BOMB
+        return EMPTY
+
+    # Publish the board after a move. Usually only the cells around the ends
+    # of the snake and the apple are rewritten; a new life, a new bomb or a
+    # missed tick rewrites the whole grid.
+    def publish(self, state):
+        self.sequence += 1  # Odd: readers retry until the next even value
+        struct.pack_into('<Q', self.buffer, 8, self.sequence)
+        grid, cols = self.grid, self.cols
+        if (state.snake is not self.snake or state.ticks != self.ticks + 1
+                or len(state.obstacles) != self.bomb_count):
+            grid[:] = bytes(len(grid))
+            for x, y in state.obstacles:
+                grid[y * cols + x] = BOMB
+            if state.food is not None:
+                grid[state.food[1] * cols + state.food[0]] = APPLE
+            for x, y in state.snake:
+                grid[y * cols + x] = BODY
+            for cell in (state.snake.tail, state.snake.head):
+                grid[cell[1] * cols + cell[0]] = self.code(state, cell)
+        else:
+            for cell in {self.head, self.tail, self.food, state.snake.head, state.snake.tail, state.food}:
+                if cell is not None:
+                    grid[cell[1] * cols + cell[0]] = self.code(state, cell)
+        self.snake = state.snake
+        self.ticks = state.ticks
+        self.head, self.tail, self.food = state.snake.head, state.snake.tail, state.food
+        self.bomb_count = len(state.obstacles)
+        self.write_header(state)
+        self.sequence += 1  # Even again, written last so readers never see it before the rest
+        struct.pack_into('<Q', self.buffer, 8, self.sequence)
+
+    # The direction the agent asked for since the last call, or None
+    def take_action(self):
+        sequence, _, code = struct.unpack_from(action_format, self.buffer, 64)
+        if sequence == self.action_sequence:
+            return None
+        self.action_sequence = sequence
+        return code_directions[code] if code < len(code_directions) else None
+
+    # Sequence number of the published tick the agent's latest action answers
+    def answered(self):
+        return struct.unpack_from('<Q', self.buffer, 72)[0]
+
+    def close(self):
+        self.grid.release()
+        self.buffer.release()
+        self.memory.close()
+        self.memory.unlink()
+
+
+# The agent's side: NumPy views straight onto the shared block
+class ObservationReader:
+    def __init__(self, name):
+        import numpy as np  # Only agents need NumPy, not the game
+        self.memory = shared_memory.SharedMemory(name)
+        # Attaching registers the block with this process's resource tracker,
+        # which would unlink it when the agent exits; the game owns it
+        resource_tracker.unregister(self.memory._name, 'shared_memory')
+        buffer = self.memory.buf
+        if bytes(buffer[:4]) != magic or struct.unpack_from('<I', buffer, 4)[0] != format_version:
+            raise ValueError(f"{name} is not a Snake Eater observation buffer")
+        self.cols, self.rows = struct.unpack_from('<II', buffer, 16)
+        self.header = np.ndarray((1,), dtype=np.dtype([
+            ('sequence', '<u8'), ('cols', '<u4'), ('rows', '<u4'), ('ticks', '<u8'), ('score', '<u4'),
+            ('total_score', '<u4'), ('lives', '<u4'), ('level', '<u4'), ('length', '<u4'), ('direction', 'u1'),
+            ('game_over', 'u1')]), buffer=buffer, offset=8)[0]
+        self.action = np.ndarray((1,), dtype=np.dtype([('sequence', '<u8'), ('answers', '<u8'), ('direction', 'u1')]),
+                                 buffer=buffer, offset=64)[0]
+        self.grid = np.ndarray((self.rows, self.cols), dtype=np.uint8, buffer=buffer, offset=header_size)
+        self.copy = np.empty_like(self.grid)
+
+    # Sequence number of the latest complete tick (even), or None mid-write
+    def sequence(self):
+        sequence = int(self.header['sequence'])
+        return None if sequence % 2 else sequence
+
+    # A consistent copy of the grid and the header fields of one tick, taken
+    # once the sequence has moved past `after`. Returns (sequence, header, grid),
+    # or None after `timeout` seconds with nothing new; the grid array is
+    # reused by the next call.
+    def read(self, after=-1, poll=0.0, timeout=None):
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            before = int(self.header['sequence'])
+            if before % 2 or before <= after:
+                if deadline is not None and time.perf_counter() > deadline:
+                    return None
+                time.sleep(poll)
+                continue
+            header = self.header.copy()
+            self.copy[...] = self.grid
+            if int(self.header['sequence']) == before:
+                return before, header, self.copy
+
+    # Ask for a direction on the next move; `sequence` is that of the tick it
+    # answers, as returned by read()
+    def act(self, direction, sequence):
+        self.action['direction'] = direction_codes[direction]
+        self.action['sequence'] += 1
+        self.action['answers'] = sequence  # Last: a lockstep host takes the action once it sees this
+
+    def close(self):
+        del self.header, self.action, self.grid
+        self.memory.close()
+
+
+# Headless game publishing every tick. With lockstep each move waits for the
+# agent to answer the tick before it, so the game runs at the agent's pace.
+# Answers are matched on the sequence number, which keeps growing across
+# games, unlike the ticks which start again at 0.
+def host(name, ticks, lockstep, cols, rows):
+    publisher = ObservationPublisher(cols, rows, name)
+    state = engine.GameState(cols=cols, rows=rows)
+    print(f"publishing {cols}x{rows} on {publisher.name}")
+    scores = []
+    try:
+        publisher.publish(state)
+        start = time.perf_counter()
+        played = 0
+        while played < ticks:
+            if lockstep:
+                while publisher.answered() < publisher.sequence:
+                    time.sleep(0)
+            if state.game_over:
+                scores.append(state.total_score)
+                state.reset()
+            state.step(publisher.take_action())
+            publisher.publish(state)
+            played += 1
+        print(f"{played / (time.perf_counter() - start):.0f} ticks/sec, {len(scores)} games finished"
+              + (f", mean score {sum(scores) / len(scores):.1f}" if scores else ""))
+    finally:
+        publisher.close()
+
+
+# Example agent: the direction that brings the head closest to the apple
+# without moving onto anything but an empty cell, the apple or the tail.
+# Stops once no tick has been published for `idle` seconds.
+def agent(name, idle=2.0):
+    import numpy as np
+    deadline = time.perf_counter() + idle
+    while True:
+        try:
+            reader = ObservationReader(name)
+            break
+        except FileNotFoundError:
+            if time.perf_counter() > deadline:
+                raise
+            time.sleep(0.05)  # The host has not created the block yet
+    sequence = -1
+    answered = 0
+    try:
+        while True:
+            observed = reader.read(sequence, timeout=idle)
+            if observed is None:
+                break
+            sequence, header, grid = observed
+            direction = code_directions[header['direction']]
+            head = np.flatnonzero(grid == HEAD)
+            apple = np.flatnonzero(grid == APPLE)
+            if head.size:
+                y, x = divmod(int(head[0]), reader.cols)
+                best = None
+                for name, (dx, dy) in engine.directions.items():
+                    cx, cy = (x + dx) % reader.cols, (y + dy) % reader.rows
+                    if name == engine.opposite[direction] or grid[cy, cx] not in (EMPTY, APPLE, TAIL):
+                        continue
+                    distance = 0
+                    if apple.size:
+                        ay, ax = divmod(int(apple[0]), reader.cols)
+                        distance = min(abs(ax - cx), reader.cols - abs(ax - cx)) + min(abs(ay - cy),
+                                                                                        reader.rows - abs(ay - cy))
+                    if best is None or distance < best[0]:
+                        best = (distance, name)
+                if best is not None:
+                    direction = best[1]
+            reader.act(direction, sequence)  # Always answer, so a lockstep host can go on
+            answered += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+    print(f"answered {answered} ticks")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Shared-memory board for external agents')
+    parser.add_argument('role', choices=['host', 'agent'])
+    parser.add_argument('name', help='name of the shared memory block')
+    parser.add_argument('--ticks', type=int, default=100000, help='moves the host plays')
+    parser.add_argument('--free-running', action='store_true', help="host doesn't wait for the agent each move")
+    parser.add_argument('--board', default=f"{engine.board_cols}x{engine.board_rows}", metavar='COLSxROWS')
+    args = parser.parse_args()
+    if args.role == 'host':
+        cols, rows = (int(n) for n in args.board.lower().split('x'))
+        host(args.name, args.ticks, not args.free_running, cols, rows)
+    else:
+        agent(args.name)
+
+
+if __name__ == '__main__':
+    main()
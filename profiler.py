@@ -0,0 +1,131 @@
+import csv
+import json
+import time
+from collections import deque
+
+import pygame
+
+# Per-frame timing for the game loop. The loop calls mark(phase) after each
+# part of a frame (events, moves, drawing, display update, waiting for the
+# next frame) and end_frame() once per frame; the time since the previous
+# mark is added to that phase. The last `window` frames feed the on-screen
+# overlay (FPS, p50/p99 frame time, average ms per phase, snake length), and
+# with keep_all every frame is kept for dump() to write as CSV or JSON.
+#
+# NullProfiler has the same methods and does nothing, so a game without
+# profiling pays for a few empty method calls per frame.
+
+
+class FrameProfiler:
+    def __init__(self, window=300, keep_all=False, overlay_interval=0.25):
+        self.start = time.perf_counter()
+        self.last = self.start  # Time of the last mark
+        self.frame_start = self.start
+        self.phases = []  # Phase names in the order they were first seen
+        self.current = {}  # Phase -> seconds so far in this frame
+        self.recent = deque(maxlen=window)  # (seconds, phases, length) of the latest frames
+        self.frames = [] if keep_all else None  # (start, seconds, phases, length) of every frame
+        self.overlay_interval = overlay_interval
+        self.overlay_surface = None
+        self.overlay_time = float('-inf')
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        if phase not in self.current:
+            self.current[phase] = 0.0
+            if phase not in self.phases:
+                self.phases.append(phase)
+        self.current[phase] += now - self.last
+        self.last = now
+
+    # Close the frame at the last mark. `length` is the snake's length.
+    def end_frame(self, length=0):
+        seconds = self.last - self.frame_start
+        self.recent.append((seconds, self.current, length))
+        if self.frames is not None:
+            self.frames.append((self.frame_start - self.start, seconds, self.current, length))
+        self.current = {}
+        self.frame_start = self.last
+
+    # Drop the frame in progress, after time that should not count (a menu)
+    def discard_frame(self):
+        self.current = {}
+        self.last = self.frame_start = time.perf_counter()
+
+    # FPS, frame time percentiles and average ms per phase over the recent frames
+    def summary(self):
+        if not self.recent:
+            return None
+        times = sorted(seconds for seconds, _, _ in self.recent)
+        n = len(times)
+        total = sum(times)
+        return {
+            'fps': n / total if total > 0 else 0.0,
+            'p50_ms': times[(n - 1) // 2] * 1000,
+            'p99_ms': times[int((n - 1) * 0.99)] * 1000,
+            'phase_ms': {phase: sum(phases.get(phase, 0.0) for _, phases, _ in self.recent) * 1000 / n
+                         for phase in self.phases},
+            'length': self.recent[-1][2],
+        }
+
+    # Surface with the summary as text, rendered again at most every
+    # overlay_interval seconds so the numbers stay readable
+    def overlay(self, font, color=(255, 255, 255), background=(0, 0, 0, 160)):
+        if self.last - self.overlay_time < self.overlay_interval and self.overlay_surface is not None:
+            return self.overlay_surface
+        summary = self.summary()
+        if summary is None:
+            return None
+        lines = [f"{summary['fps']:.0f} fps  p50 {summary['p50_ms']:.1f} ms  p99 {summary['p99_ms']:.1f} ms",
+                 f"length {summary['length']}"]
+        lines += [f"{phase:<8} {ms:6.2f} ms" for phase, ms in summary['phase_ms'].items()]
+        texts = [font.render(line, True, color) for line in lines]
+        line_height = font.get_linesize()
+        surface = pygame.Surface((max(text.get_width() for text in texts) + 8, line_height * len(texts) + 6),
+                                 pygame.SRCALPHA)
+        surface.fill(background)
+        for i, text in enumerate(texts):
+            surface.blit(text, (4, 3 + i * line_height))
+        self.overlay_surface = surface
+        self.overlay_time = self.last
+        return surface
+
+    # Write every kept frame to `path`, as JSON if it ends in .json and CSV
+    # otherwise. Times are in milliseconds.
+    def dump(self, path):
+        frames = self.frames if self.frames is not None else [(None, s, p, n) for s, p, n in self.recent]
+        rows = []
+        for i, (start, seconds, phases, length) in enumerate(frames):
+            row = {'frame': i, 'start_ms': None if start is None else round(start * 1000, 3),
+                   'frame_ms': round(seconds * 1000, 3), 'length': length}
+            for phase in self.phases:
+                row[phase + '_ms'] = round(phases.get(phase, 0.0) * 1000, 3)
+            rows.append(row)
+        with open(path, 'w', newline='') as f:
+            if path.endswith('.json'):
+                json.dump({'phases': self.phases, 'frames': rows}, f)
+            else:
+                writer = csv.DictWriter(f, ['frame', 'start_ms', 'frame_ms', 'length'] +
+                                        [phase + '_ms' for phase in self.phases])
+                writer.writeheader()
+                writer.writerows(rows)
+
+
+class NullProfiler:
+    def mark(self, phase):
+        pass
+
+    def end_frame(self, length=0):
+        pass
+
+    def discard_frame(self):
+        pass
+
+    def summary(self):
+        return None
+
+    def overlay(self, font, color=(255, 255, 255), background=(0, 0, 0, 160)):
+        return None
+
+    def dump(self, path):
+        pass
@@ -0,0 +1,175 @@
+import os
+import sys
+import time
+
+import engine
+
+# Games recorded as the seed plus the turns the player made. The engine only
+# uses its own seeded random generator and moves one cell per step whatever
+# the frame rate, so stepping a fresh GameState with the same seed and the
+# same turns at the same ticks plays the exact same game again.
+#
+# File format (all numbers after the header are unsigned LEB128 varints):
+#   b'SNKR', format version byte,
+#   cols, rows, lives, seed, ticks played, final total score, number of turns,
+#   then one varint per turn: (ticks since the previous turn << 2) | direction
+# A whole game is usually a few hundred bytes.
+
+magic = b'SNKR'
+format_version = 1
+
+# Direction name <-> 2-bit code used in the file
+direction_codes = {'UP': 0, 'DOWN': 1, 'LEFT': 2, 'RIGHT': 3}
+code_directions = ['UP', 'DOWN', 'LEFT', 'RIGHT']
+
+
+# Random 64-bit seed for a new game
+def new_seed():
+    return int.from_bytes(os.urandom(8), 'little')
+
+
+def write_varint(out, n):
+    while n >= 0x80:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+# Returns the number and the position just after it
+def read_varint(data, pos):
+    n = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("recording is truncated")
+        byte = data[pos]
+        pos += 1
+        n |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return n, pos
+        shift += 7
+
+
+class Recording:
+    def __init__(self, seed, cols=engine.board_cols, rows=engine.board_rows, lives=engine.initial_lives):
+        self.seed = seed
+        self.cols = cols
+        self.rows = rows
+        self.lives = lives
+        self.inputs = []  # (tick, direction): turned while state.ticks was `tick`
+        self.ticks = 0  # Moves in the whole game, set by finish()
+        self.total_score = 0
+
+    # Note an accepted turn, made before the move that takes ticks to tick + 1
+    def record(self, tick, direction):
+        self.inputs.append((tick, direction))
+
+    # Note how the game ended, so a replay knows when to stop and can check itself
+    def finish(self, state):
+        self.ticks = state.ticks
+        self.total_score = state.total_score
+
+    # A fresh game set up exactly like the recorded one
+    def new_game(self):
+        return engine.GameState(cols=self.cols, rows=self.rows, lives=self.lives, seed=self.seed)
+
+    def to_bytes(self):
+        out = bytearray(magic)
+        out.append(format_version)
+        for n in (self.cols, self.rows, self.lives, self.seed, self.ticks, self.total_score, len(self.inputs)):
+            write_varint(out, n)
+        previous = 0
+        for tick, direction in self.inputs:
+            write_varint(out, (tick - previous) << 2 | direction_codes[direction])
+            previous = tick
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if data[:4] != magic:
+            raise ValueError("not a Snake Eater recording")
+        if data[4] != format_version:
+            raise ValueError(f"unsupported recording version {data[4]}")
+        pos = 5
+        fields = []
+        for _ in range(7):
+            n, pos = read_varint(data, pos)
+            fields.append(n)
+        cols, rows, lives, seed, ticks, total_score, count = fields
+        recording = cls(seed, cols, rows, lives)
+        recording.ticks = ticks
+        recording.total_score = total_score
+        tick = 0
+        for _ in range(count):
+            n, pos = read_varint(data, pos)
+            tick += n >> 2
+            recording.inputs.append((tick, code_directions[n & 3]))
+        return recording
+
+    # Write the file in one go, so a crash never leaves half a recording
+    def save(self, path):
+        partial = path + '.part'
+        with open(partial, 'wb') as f:
+            f.write(self.to_bytes())
+        os.replace(partial, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+
+# Reseed and reset `state` for a new game and return the recording for it
+def start_recording(state):
+    seed = new_seed()
+    state.reset(seed)
+    return Recording(seed, state.cols, state.rows, state.max_lives)
+
+
+# Steps a recorded game one move at a time, making the recorded turns at the
+# right ticks. Used headless by replay() and by the window's replay mode.
+class Playback:
+    def __init__(self, recording):
+        self.recording = recording
+        self.state = recording.new_game()
+        self.next_input = 0
+
+    @property
+    def done(self):
+        return self.state.game_over or self.state.ticks >= self.recording.ticks
+
+    # One move; returns the engine's events
+    def step(self):
+        inputs = self.recording.inputs
+        while self.next_input < len(inputs) and inputs[self.next_input][0] <= self.state.ticks:
+            self.state.turn(inputs[self.next_input][1])
+            self.next_input += 1
+        return self.state.step()
+
+    # True if the game ended where the recording says it did
+    def matches(self):
+        return self.state.ticks == self.recording.ticks and self.state.total_score == self.recording.total_score
+
+
+# Replay a whole game as fast as possible; returns the Playback at the end
+def replay(recording):
+    playback = Playback(recording)
+    while not playback.done:
+        playback.step()
+    return playback
+
+
+# Check recordings from the command line: python recording.py FILE...
+if __name__ == '__main__':
+    failed = False
+    for path in sys.argv[1:]:
+        recording = Recording.load(path)
+        start = time.perf_counter()
+        playback = replay(recording)
+        seconds = time.perf_counter() - start
+        result = 'ok' if playback.matches() else 'MISMATCH'
+        failed = failed or result != 'ok'
+        print(f"{path}: {result}, score {playback.state.total_score}, {playback.state.ticks} ticks, "
+              f"{len(recording.inputs)} turns, {os.path.getsize(path)} bytes, "
+              f"{playback.state.ticks / max(seconds, 1e-9):,.0f} ticks/sec")
+    sys.exit(1 if failed else 0)
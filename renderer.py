@@ -0,0 +1,382 @@
+import pygame
+
+from profiler import NullProfiler
+from sprites import display_format
+
+# Draws an engine.GameState onto the gameplay screen. present() works out
+# which grid cells changed since the last frame it drew (old and new head,
+# old and new tail, the apple) and repaints and pushes only those,
+# so a frame where the snake did not move costs nothing and a frame where it
+# did costs the same at any length. When several moves happen between two
+# frames, note_move() after each one remembers the cells the snake's ends
+# passed through. Anything it cannot follow cheaply, like a new life, the
+# camera moving or moves that were not noted, falls back to redrawing the
+# whole view.
+#
+# What only changes with the bombs is kept in a static layer: a surface the
+# size of the field area holding the background with every bomb in view
+# already drawn on it. Repainting a cell, or the whole view, starts with one
+# blit from it however many bombs there are. The layer is built again when
+# the camera moves or a new life clears the bombs; a new bomb is only drawn
+# into the few cells it covers. The apple and the snake go on top of it.
+#
+# Boards bigger than the screen are shown through a camera: the field area
+# is a window onto the (wrapping) board, and the camera jumps to centre the
+# head whenever it gets within follow_margin cells of the window's edge.
+# Everything is drawn in view cells, so only what is on screen is looked at:
+# drawing the whole view costs the same on a 60x40 board as on a 1000x1000
+# one, and the same for a snake of 10 or 100000. The field image is tiled
+# across the board; one pre-tiled surface covers any camera position, so the
+# background of the whole view is a single blit.
+#
+# present() can also draw an overlay surface (the profiler's) over the top
+# left of the field; the field under it is repainted each frame.
+
+
+class GameRenderer:
+    def __init__(self, surface, block, header_height, field_image, apple_image, bomb_image,
+                 sprites, text_cache, hud_font, hud_color, hud_background, profiler=None, follow_margin=None):
+        self.surface = surface
+        self.block = block
+        self.header_height = header_height
+        self.field_image = field_image
+        self.apple_image = apple_image
+        self.bomb_image = bomb_image
+        self.sprites = sprites  # sprites.SpriteAtlas with the snake in every direction
+        self.text_cache = text_cache  # text_cache.TextCache shared with the menus
+        self.hud_font = hud_font
+        self.hud_color = hud_color
+        self.hud_background = hud_background
+        self.profiler = profiler if profiler is not None else NullProfiler()  # Times drawing and display update
+        self.follow_margin = follow_margin  # Cells from the view's edge where the camera moves (default 1/4)
+        self.screen_cols = surface.get_width() // block
+        self.screen_rows = (surface.get_height() - header_height) // block
+        self.background = self.tile_field()
+        self.static = display_format(pygame.Surface((self.screen_cols * block, self.screen_rows * block)), alpha=False)
+        self.set_board(self.screen_cols, self.screen_rows)
+        self.invalidate()
+
+    # The field image repeated enough times that a view-sized area can be cut
+    # from it at any offset within the first tile
+    def tile_field(self):
+        tile_width, tile_height = self.field_image.get_size()
+        across = 1 + -(-self.screen_cols * self.block // tile_width)
+        down = 1 + -(-self.screen_rows * self.block // tile_height)
+        background = display_format(pygame.Surface((tile_width * across, tile_height * down)), alpha=False)
+        for y in range(down):
+            for x in range(across):
+                background.blit(self.field_image, (x * tile_width, y * tile_height))
+        return background
+
+    # Size of the board being drawn. The view is the screen's field area, or
+    # the whole board if that is smaller. Sprites from just outside the view
+    # only show through (as one cell of margin) when the board scrolls.
+    def set_board(self, cols, rows):
+        self.board_cols = cols
+        self.board_rows = rows
+        self.view_cols = min(self.screen_cols, cols)
+        self.view_rows = min(self.screen_rows, rows)
+        self.margin_x = 1 if cols >= self.view_cols + 2 else 0
+        self.margin_y = 1 if rows >= self.view_rows + 2 else 0
+        self.scrolls = cols > self.view_cols or rows > self.view_rows
+        self.move_camera((0, 0))
+
+    # Put the view's top left corner on a board cell
+    def move_camera(self, camera):
+        self.camera = camera
+        # Where the view's top left corner falls in the tiled background
+        self.background_offset = (camera[0] * self.block % self.field_image.get_width(),
+                                  camera[1] * self.block % self.field_image.get_height())
+        self.static_obstacles = None  # The static layer needs building for the new camera
+
+    # Forget what is on screen so the next present() redraws everything.
+    # Call this after another screen (menu, game over) has drawn over the game.
+    def invalidate(self):
+        self.drawn_snake = None
+        self.moved_cells = set()
+        self.overlay_rect = None
+
+    # Remember where the snake's head and tail are after a move, so the next
+    # present() can repaint the cells of every move since the last frame
+    def note_move(self, state):
+        if state.snake is self.drawn_snake and state.ticks == self.noted_ticks + 1:
+            self.moved_cells.update((state.snake.head, state.snake.tail))
+            self.noted_ticks = state.ticks
+
+    # Move the camera to centre `head` if it is too close to the view's edge.
+    # Returns True if the camera moved.
+    def follow(self, head):
+        if not self.scrolls:
+            return False
+        camera = list(self.camera)
+        for axis, size, view in ((0, self.board_cols, self.view_cols), (1, self.board_rows, self.view_rows)):
+            if size <= view:
+                continue
+            margin = self.follow_margin if self.follow_margin is not None else view // 4
+            position = (head[axis] - camera[axis]) % size
+            if position < margin or position >= view - margin:
+                camera[axis] = (head[axis] - view // 2) % size
+        camera = tuple(camera)
+        if camera == self.camera:
+            return False
+        self.move_camera(camera)
+        return True
+
+    # Board cell shown at view cell (i, j)
+    def board_cell(self, i, j):
+        if not self.scrolls:
+            return (i, j)
+        return ((self.camera[0] + i) % self.board_cols, (self.camera[1] + j) % self.board_rows)
+
+    # View cell showing a board cell, or None if it is off screen
+    def view_cell(self, cell):
+        if not self.scrolls:
+            return cell
+        i = (cell[0] - self.camera[0]) % self.board_cols
+        j = (cell[1] - self.camera[1]) % self.board_rows
+        if i < self.view_cols and j < self.view_rows:
+            return (i, j)
+        return None
+
+    # Every view cell (margin included) where a sprite on a board cell is drawn
+    def view_positions(self, cell):
+        if not self.scrolls:
+            return [cell]  # The whole board is in view, from its top left corner
+        i = (cell[0] - self.camera[0]) % self.board_cols
+        j = (cell[1] - self.camera[1]) % self.board_rows
+        xs = [x for x in (i, i - self.board_cols) if -self.margin_x <= x < self.view_cols + self.margin_x]
+        ys = [y for y in (j, j - self.board_rows) if -self.margin_y <= y < self.view_rows + self.margin_y]
+        return [(x, y) for y in ys for x in xs]
+
+    # Screen rect of a view cell
+    def cell_rect(self, cell):
+        return pygame.Rect(cell[0] * self.block, cell[1] * self.block + self.header_height, self.block, self.block)
+
+    # Image for the snake segment on `cell`
+    def segment_sprite(self, snake, cell, direction):
+        if cell == snake.head:
+            return self.sprites.head(direction)
+        if len(snake) > 1 and cell == snake.tail:
+            return self.sprites.tail(snake[0], snake[1])
+        return self.sprites.body
+
+    # The static layer (field and bombs) under a screen rect
+    def draw_background(self, rect):
+        self.surface.blit(self.static, rect, rect.move(0, -self.header_height))
+
+    def draw_field(self):
+        self.surface.blit(self.static, (0, self.header_height))
+
+    # Apple image (20x20) centered on a view cell
+    def draw_apple(self, cell):
+        self.surface.blit(self.apple_image, (cell[0] * self.block - 5, cell[1] * self.block + self.header_height - 5))
+
+    # Bomb image (30x30) centered on a view cell of the static layer
+    def draw_bomb(self, cell):
+        self.static.blit(self.bomb_image, (cell[0] * self.block - 10, cell[1] * self.block - 10))
+
+    # Draw the bombs in view into the static layer. Bombs overlap their
+    # neighbours, so they are always drawn row by row to look the same whether
+    # the whole layer or the area around one new bomb is drawn. With fewer
+    # bombs than view cells they are looked up one by one, otherwise every
+    # view cell is checked.
+    def draw_obstacles(self, obstacles):
+        cols = range(-self.margin_x, self.view_cols + self.margin_x)
+        rows = range(-self.margin_y, self.view_rows + self.margin_y)
+        if not self.scrolls:
+            positions = sorted(obstacles, key=lambda c: (c[1], c[0]))
+        elif len(obstacles) < len(cols) * len(rows):
+            positions = sorted((position for cell in obstacles for position in self.view_positions(cell)),
+                               key=lambda p: (p[1], p[0]))
+        else:
+            positions = [(i, j) for j in rows for i in cols if self.board_cell(i, j) in obstacles]
+        for position in positions:
+            self.draw_bomb(position)
+
+    # Lay the tiled field, scrolled with the camera, and the bombs in view
+    # into the static layer
+    def build_static(self, state):
+        self.static.blit(self.background, (0, 0), self.static.get_rect().move(self.background_offset))
+        self.draw_obstacles(state.obstacles)
+        self.static_obstacles = state.obstacles
+        self.static_bombs = len(state.obstacles)
+
+    # Draw one new bomb into the static layer: the area under it is laid
+    # again from the field up with every bomb touching it, in row order.
+    # Adds the view cells it covers to `dirty`.
+    def add_static_bomb(self, state, cell, dirty):
+        obstacles = state.obstacles
+        for x, y in self.view_positions(cell):
+            area = pygame.Rect(x * self.block - 10, y * self.block - 10, 30, 30)
+            self.static.set_clip(area)
+            self.static.blit(self.background, area, area.move(self.background_offset))
+            for j in range(max(y - 2, -self.margin_y), min(y + 3, self.view_rows + self.margin_y)):
+                for i in range(max(x - 2, -self.margin_x), min(x + 3, self.view_cols + self.margin_x)):
+                    if self.board_cell(i, j) in obstacles:
+                        self.draw_bomb((i, j))
+            self.static.set_clip(None)
+            self.cells_around((x, y), dirty)
+        self.static_bombs += 1
+
+    # Bring the static layer up to date with the state's bombs. Returns True
+    # if it was built again, which means the whole view needs redrawing.
+    def update_static(self, state, dirty):
+        obstacles = state.obstacles
+        if obstacles is self.static_obstacles and len(obstacles) == self.static_bombs:
+            return False
+        if (obstacles is self.static_obstacles and len(obstacles) == self.static_bombs + 1
+                and state.last_obstacle in obstacles):
+            self.add_static_bomb(state, state.last_obstacle, dirty)
+            return False
+        self.build_static(state)
+        return True
+
+    # The snake segments in view, found the cheaper way like the bombs
+    def draw_snake(self, snake, direction):
+        if not self.scrolls:
+            for cell in snake:
+                self.surface.blit(self.segment_sprite(snake, cell, direction), self.cell_rect(cell))
+        elif len(snake) < self.view_cols * self.view_rows:
+            for cell in snake:
+                position = self.view_cell(cell)
+                if position is not None:
+                    self.surface.blit(self.segment_sprite(snake, cell, direction), self.cell_rect(position))
+        else:
+            counts = snake.counts  # Segments per board cell, row by row
+            for j in range(self.view_rows):
+                y = (self.camera[1] + j) % self.board_rows
+                row = y * self.board_cols
+                for i in range(self.view_cols):
+                    x = (self.camera[0] + i) % self.board_cols
+                    if counts[row + x]:
+                        self.surface.blit(self.segment_sprite(snake, (x, y), direction), self.cell_rect((i, j)))
+
+    # Score, total, lives and level across the header. Every label and value
+    # is its own cached text surface, so when one value changes only that
+    # value is rendered again and the rest are reused.
+    def draw_hud(self, score, lives, level, total_score):
+        width = self.surface.get_width()
+        pygame.draw.rect(self.surface, self.hud_background, [0, 0, width, self.header_height])
+        parts = ["Score: ", str(score), " | Total: ", str(total_score), " | Lives: ", str(lives), " | Level: ", str(level)]
+        surfaces = [self.text_cache.render(self.hud_font, part, self.hud_color) for part in parts]
+        x = (width - sum(surface.get_width() for surface in surfaces)) // 2
+        for surface in surfaces:
+            self.surface.blit(surface, surface.get_rect(midleft=(x, self.header_height // 2)))
+            x += surface.get_width()
+
+    def draw_all(self, state):
+        self.draw_field()
+        if state.food is not None:
+            for position in self.view_positions(state.food):
+                self.draw_apple(position)
+        self.draw_snake(state.snake, state.direction)
+        self.draw_hud(state.score, state.lives, state.level, state.total_score)
+
+    # Redraw a block of view cells from the static layer up: the apple if it
+    # overlaps them, then the snake segments on them. Returns its rect.
+    def repaint_cells(self, state, first_col, first_row, last_col, last_row):
+        rect = pygame.Rect(first_col * self.block, first_row * self.block + self.header_height,
+                           (last_col - first_col + 1) * self.block, (last_row - first_row + 1) * self.block)
+        self.surface.set_clip(rect)
+        self.draw_background(rect)
+        if state.food is not None:
+            for x, y in self.view_positions(state.food):
+                if first_col - 1 <= x <= last_col + 1 and first_row - 1 <= y <= last_row + 1:
+                    self.draw_apple((x, y))
+        camera_x, camera_y = self.camera
+        cols, rows = self.board_cols, self.board_rows
+        snake = state.snake
+        for j in range(max(first_row, 0), min(last_row + 1, self.view_rows)):
+            for i in range(max(first_col, 0), min(last_col + 1, self.view_cols)):
+                cell = ((camera_x + i) % cols, (camera_y + j) % rows)
+                if cell in snake:
+                    self.surface.blit(self.segment_sprite(snake, cell, state.direction), self.cell_rect((i, j)))
+        self.surface.set_clip(None)
+        return rect
+
+    # Redraw one view cell. When the whole board is in view, view and board
+    # cells are the same and there is no margin, which makes this much cheaper
+    # than going through repaint_cells(); it is what most frames spend their
+    # drawing time on.
+    def repaint_cell(self, state, cell):
+        if self.scrolls:
+            return self.repaint_cells(state, cell[0], cell[1], cell[0], cell[1])
+        rect = self.cell_rect(cell)
+        self.surface.set_clip(rect)
+        self.draw_background(rect)
+        x, y = cell
+        food = state.food
+        if food is not None and abs(food[0] - x) <= 1 and abs(food[1] - y) <= 1:
+            self.draw_apple(food)
+        if x < self.view_cols and y < self.view_rows and cell in state.snake:
+            self.surface.blit(self.segment_sprite(state.snake, cell, state.direction), rect)
+        self.surface.set_clip(None)
+        return rect
+
+    # Redraw the view cells under a screen rect
+    def repaint_area(self, state, rect):
+        return self.repaint_cells(state, rect.left // self.block, (rect.top - self.header_height) // self.block,
+                                  (rect.right - 1) // self.block, (rect.bottom - 1 - self.header_height) // self.block)
+
+    # View cells covered by a sprite drawn one cell past its own in every
+    # direction (on a board smaller than the screen, that can be just past it)
+    def cells_around(self, cell, dirty):
+        for y in range(max(cell[1] - 1, 0), min(cell[1] + 2, self.screen_rows)):
+            for x in range(max(cell[0] - 1, 0), min(cell[0] + 2, self.screen_cols)):
+                dirty.add((x, y))
+
+    # Draw the state (and `overlay`, if given) and push the changed parts to
+    # the display. Returns the list of rects that were updated (empty if
+    # nothing changed).
+    def present(self, state, overlay=None):
+        snake = state.snake
+        hud = (state.score, state.lives, state.level, state.total_score)
+        if (state.cols, state.rows) != (self.board_cols, self.board_rows):
+            self.set_board(state.cols, state.rows)
+            self.drawn_snake = None
+        moved = self.follow(snake.head)
+        dirty = set()  # View cells to repaint
+        rebuilt = self.update_static(state, dirty)
+        full = (moved or rebuilt or snake is not self.drawn_snake
+                or (state.ticks - self.drawn_ticks > 1 and state.ticks != self.noted_ticks))
+        if full:
+            self.draw_all(state)
+            rects = [self.surface.get_rect()]
+        else:
+            ends = self.moved_cells
+            if state.ticks != self.drawn_ticks or state.direction != self.drawn_direction:
+                ends.update((self.drawn_head, self.drawn_tail, snake.head, snake.tail))
+            for cell in ends:
+                position = self.view_cell(cell)
+                if position is not None:
+                    dirty.add(position)
+            if state.food != self.drawn_food:
+                for food in (self.drawn_food, state.food):
+                    if food is not None:
+                        for position in self.view_positions(food):
+                            self.cells_around(position, dirty)
+            rects = [self.repaint_cell(state, cell) for cell in dirty]
+            if hud != self.drawn_hud:
+                self.draw_hud(*hud)
+                rects.append(pygame.Rect(0, 0, self.surface.get_width(), self.header_height))
+            if self.overlay_rect is not None:
+                rects.append(self.repaint_area(state, self.overlay_rect))
+        self.overlay_rect = None
+        if overlay is not None:
+            self.overlay_rect = self.surface.blit(overlay, (0, self.header_height))
+            rects.append(self.overlay_rect)
+
+        self.drawn_snake = snake
+        self.drawn_ticks = state.ticks
+        self.noted_ticks = state.ticks
+        self.moved_cells = set()
+        self.drawn_direction = state.direction
+        self.drawn_head = snake.head
+        self.drawn_tail = snake.tail
+        self.drawn_food = state.food
+        self.drawn_hud = hud
+        self.profiler.mark('draw')
+        if rects:
+            pygame.display.update(rects)
+        self.profiler.mark('display')
+        return rects
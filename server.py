@@ -0,0 +1,254 @@
+import argparse
+import asyncio
+import time
+
+import engine
+from arena import Arena, ArenaView
+from recording import code_directions, direction_codes, read_varint, write_varint
+from timestep import FixedTimestep
+
+# Multiplayer server: any number of rooms, each an arena.Arena with several
+# snakes, all stepped by one tick loop on one asyncio event loop. The server
+# is the only one running the rules; clients send turns and get back what
+# changed each tick as arena ops, which are encoded once per room and the
+# same bytes written to every client in it.
+#
+#   python server.py --port 8765
+#   python benchmarks/loadtest.py --port 8765 --rooms 200 --players 4
+#
+# Every message is a 4-byte big-endian length and then the message, whose
+# first byte is its type. Numbers are varints as in recording.py.
+#   client -> server  MSG_JOIN     room name length, room name, player name length, player name
+#                     MSG_TURN     direction code byte
+#                     MSG_RESTART  (start again once out of lives)
+#   server -> client  MSG_WELCOME  player id, cols, rows, tick, ops building the whole board
+#                     MSG_UPDATE   tick, ops since the last update
+# A client that stops reading is disconnected once max_buffer bytes are
+# waiting for it, rather than letting the server's memory grow.
+
+MSG_JOIN = 1
+MSG_TURN = 2
+MSG_RESTART = 3
+MSG_WELCOME = 1
+MSG_UPDATE = 2
+
+max_message = 1024  # Longest message a client may send
+
+
+def frame(message):
+    return len(message).to_bytes(4, 'big') + message
+
+
+async def read_message(reader, limit=None):
+    size = int.from_bytes(await reader.readexactly(4), 'big')
+    if limit is not None and size > limit:
+        raise ValueError(f"message of {size} bytes")
+    return await reader.readexactly(size)
+
+
+def read_text(data, pos):
+    size, pos = read_varint(data, pos)
+    return data[pos:pos + size].decode(), pos + size
+
+
+def write_text(out, text):
+    text = text.encode()
+    write_varint(out, len(text))
+    out += text
+
+
+class Room:
+    def __init__(self, name, cols, rows, lives):
+        self.name = name
+        self.arena = Arena(cols, rows, lives)
+        self.clients = {}  # Player id -> StreamWriter
+
+    # Send the ops since the last flush to everyone in the room
+    def flush(self, server):
+        ops = self.arena.take_ops()
+        if not ops:
+            return
+        message = bytearray([MSG_UPDATE])
+        write_varint(message, self.arena.ticks)
+        message += ops
+        data = frame(message)
+        for writer in list(self.clients.values()):
+            server.send(writer, data)
+
+
+class GameServer:
+    def __init__(self, cols=engine.board_cols, rows=engine.board_rows, lives=engine.initial_lives, tick_rate=60,
+                 max_buffer=1 << 20):
+        self.cols = cols
+        self.rows = rows
+        self.lives = lives
+        self.tick_rate = tick_rate
+        self.max_buffer = max_buffer
+        self.rooms = {}
+        self.bytes_sent = 0
+        self.tick_times = []  # Seconds each tick took since the last report
+
+    def send(self, writer, data):
+        if writer.is_closing():
+            return
+        if writer.transport.get_write_buffer_size() > self.max_buffer:
+            writer.close()  # Too far behind; its handler removes the player
+            return
+        writer.write(data)
+        self.bytes_sent += len(data)
+
+    async def handle(self, reader, writer):
+        room = player = None
+        try:
+            message = await read_message(reader, max_message)
+            if not message or message[0] != MSG_JOIN:
+                return
+            room_name, pos = read_text(message, 1)
+            player_name, _ = read_text(message, pos)
+            room = self.rooms.get(room_name)
+            if room is None:
+                room = self.rooms[room_name] = Room(room_name, self.cols, self.rows, self.lives)
+            room.flush(self)  # Everyone else is brought up to date before the snapshot is taken
+            player = room.arena.add_player(player_name)
+            room.flush(self)
+            welcome = bytearray([MSG_WELCOME])
+            for n in (player.id, self.cols, self.rows, room.arena.ticks):
+                write_varint(welcome, n)
+            welcome += room.arena.snapshot()
+            self.send(writer, frame(welcome))
+            room.clients[player.id] = writer
+
+            while True:
+                message = await read_message(reader, max_message)
+                if not message:
+                    return
+                if message[0] == MSG_TURN and len(message) == 2 and message[1] < len(code_directions):
+                    room.arena.turn(player.id, code_directions[message[1]])
+                elif message[0] == MSG_RESTART:
+                    room.arena.restart(player.id)
+        except (asyncio.IncompleteReadError, ConnectionError, UnicodeDecodeError, ValueError):
+            pass
+        finally:
+            if player is not None:
+                room.clients.pop(player.id, None)
+                room.arena.remove_player(player.id)
+                if not room.clients and self.rooms.get(room.name) is room:
+                    del self.rooms[room.name]
+            writer.close()
+
+    # Step every room tick_rate times a second and send out what changed.
+    # After a stall the missed ticks are caught up, up to FixedTimestep's cap.
+    async def tick_loop(self, report_interval=None):
+        loop = asyncio.get_running_loop()
+        interval = 1.0 / self.tick_rate
+        ticks = FixedTimestep()
+        last = last_report = loop.time()
+        bytes_reported = 0
+        while True:
+            await asyncio.sleep(max(0.0, last + interval - loop.time()))
+            now = loop.time()
+            ticks.advance(now - last)
+            last = now
+            start = time.perf_counter()
+            while ticks.consume(interval):
+                for room in self.rooms.values():
+                    room.arena.step(interval)
+            for room in list(self.rooms.values()):
+                room.flush(self)
+            self.tick_times.append(time.perf_counter() - start)
+
+            if report_interval and now - last_report >= report_interval:
+                players = sum(len(room.clients) for room in self.rooms.values())
+                times = sorted(self.tick_times)
+                print(f"{len(self.rooms)} rooms, {players} players, {len(times) / (now - last_report):.0f} ticks/sec, "
+                      f"tick {sum(times) / len(times) * 1000:.2f} ms avg {times[-1] * 1000:.2f} ms max, "
+                      f"{(self.bytes_sent - bytes_reported) / (now - last_report) / 1024:.0f} KiB/s out", flush=True)
+                self.tick_times = []
+                bytes_reported = self.bytes_sent
+                last_report = now
+
+    async def serve(self, host='127.0.0.1', port=8765, report_interval=None):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await self.tick_loop(report_interval)
+
+
+# The client side of the protocol, with the room mirrored in an ArenaView
+class Client:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.player_id = None
+        self.view = None
+        self.ticks = 0
+        self.bytes_received = 0
+
+    @classmethod
+    async def connect(cls, room, name, host='127.0.0.1', port=8765):
+        client = cls(*await asyncio.open_connection(host, port))
+        join = bytearray([MSG_JOIN])
+        write_text(join, room)
+        write_text(join, name)
+        client.writer.write(frame(join))
+        message = await client.receive_message()
+        if message[0] != MSG_WELCOME:
+            raise ValueError("expected a welcome message")
+        client.player_id, pos = read_varint(message, 1)
+        cols, pos = read_varint(message, pos)
+        rows, pos = read_varint(message, pos)
+        client.ticks, pos = read_varint(message, pos)
+        client.view = ArenaView(cols, rows)
+        client.view.apply(message, pos)
+        return client
+
+    async def receive_message(self):
+        message = await read_message(self.reader)
+        self.bytes_received += len(message) + 4
+        return message
+
+    # Wait for the next update and apply it to the view; returns its tick
+    async def receive(self):
+        message = await self.receive_message()
+        if message[0] != MSG_UPDATE:
+            raise ValueError(f"unexpected message type {message[0]}")
+        self.ticks, pos = read_varint(message, 1)
+        self.view.apply(message, pos)
+        return self.ticks
+
+    def turn(self, direction):
+        self.writer.write(frame(bytes([MSG_TURN, direction_codes[direction]])))
+
+    def restart(self):
+        self.writer.write(frame(bytes([MSG_RESTART])))
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Snake Eater multiplayer server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--board', default=f"{engine.board_cols}x{engine.board_rows}", metavar='COLSxROWS')
+    parser.add_argument('--lives', type=int, default=engine.initial_lives)
+    parser.add_argument('--tick-rate', type=int, default=60, help='server ticks per second (default 60)')
+    parser.add_argument('--report', type=float, default=5.0, metavar='SECONDS',
+                        help='print load figures this often (0 for never)')
+    args = parser.parse_args()
+    try:
+        cols, rows = (int(n) for n in args.board.lower().split('x'))
+    except ValueError:
+        parser.error(f"--board must look like 60x40, not {args.board}")
+    server = GameServer(cols, rows, args.lives, args.tick_rate)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.report))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
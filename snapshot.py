@@ -0,0 +1,400 @@
+import argparse
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+from array import array
+from itertools import islice
+
+import engine
+from autopilot import cycle_step
+from recording import Recording, code_directions, direction_codes, read_varint, write_varint
+
+# A game in progress saved whole, so it can be carried on later exactly where
+# it stopped: the snake, bombs, apple and counters, plus the random generator
+# and the order of engine.FreeCells, which between them decide where later
+# apples and bombs go. A restored game plays on exactly as the saved one
+# would have, so its recording still replays.
+# Snapshots are also handy for starting benchmarks and tests from a given
+# point (see scenario()) instead of playing up to it.
+#
+# File format (numbers are unsigned LEB128 varints unless noted):
+#   b'SNKS', format version byte,
+#   cols, rows, then the GameState counters listed in `counters`,
+#   flags byte: game over (bit 0), moving (bit 1), direction code (bits 2-3),
+#   speed (little-endian double),
+#   apple cell number + 1 (0 for no apple),
+#   number of bombs, then their cell numbers in order as gaps from the one before,
+#   number of snake segments, tail cell number, then a 2-bit direction code per
+#   segment from the tail to the head, four to a byte,
+#   number of free cells, then the free-cell index's cell numbers in its own
+#   order (little-endian u16, or u32 on boards of over 65536 cells),
+#   the random generator's 625 state words (u32 each), a byte saying whether
+#   a cached gauss value follows and that value (double),
+#   length of the game's recording and the recording (recording.py), which
+#   is empty when there is none.
+# Cell numbers are y * cols + x. A game on the 60x40 board takes at most about
+# 8 KB, and most of the work of writing one is copying arrays.
+
+magic = b'SNKS'
+format_version = 1
+rng_words = 625
+
+# GameState counters in the order they are written
+counters = ('max_lives', 'lives', 'level', 'score', 'total_score', 'length', 'ticks', 'best_level', 'best_length')
+
+
+# The snake's cells after the tail as one 2-bit direction code each, four to
+# a byte. Consecutive segments are always neighbours (across the wrap too).
+def pack_moves(cells, cols, rows):
+    codes = {(dx % cols, dy % rows): direction_codes[name] for name, (dx, dy) in engine.directions.items()}
+    moves = bytearray()
+    previous = cells[0]
+    for cell in islice(cells, 1, None):
+        code = codes.get(((cell[0] - previous[0]) % cols, (cell[1] - previous[1]) % rows))
+        if code is None:
+            raise ValueError(f"snake segments {previous} and {cell} are not neighbours")
+        moves.append(code)
+        previous = cell
+    moves += bytes(-len(moves) % 4)
+    return bytes(a | b << 2 | c << 4 | d << 6 for a, b, c, d in zip(moves[0::4], moves[1::4], moves[2::4], moves[3::4]))
+
+
+# The four codes in each packed byte
+unpacked = [tuple(n >> shift & 3 for shift in (0, 2, 4, 6)) for n in range(256)]
+
+
+def unpack_moves(data, tail, count, cols, rows):
+    offsets = [engine.directions[name] for name in code_directions]
+    x, y = tail
+    cells = [tail]
+    for code in islice((code for byte in data for code in unpacked[byte]), count - 1):
+        dx, dy = offsets[code]
+        x = (x + dx) % cols
+        y = (y + dy) % rows
+        cells.append((x, y))
+    return cells
+
+
+class Snapshot:
+    def __init__(self, cols, rows):
+        self.cols = cols
+        self.rows = rows
+        self.counters = [0] * len(counters)
+        self.game_over = False
+        self.direction = 'UP'
+        self.moving = False
+        self.speed = engine.initial_speed
+        self.food = None
+        self.obstacles = []
+        self.snake = []  # Tail first
+        self.free = array('i')  # engine.FreeCells.cells, in order
+        self.rng_state = None  # random.Random.getstate()
+        self.recording = None  # recording.Recording of the game so far, if it has one
+
+    # Copy what is needed out of `state` (and its recording). Only plain
+    # copies happen here, so it is cheap enough to call from the game loop;
+    # the encoding is left for to_bytes().
+    @classmethod
+    def take(cls, state, recording=None):
+        snapshot = cls(state.cols, state.rows)
+        snapshot.counters = [getattr(state, name) for name in counters]
+        snapshot.game_over = state.game_over
+        snapshot.direction = state.direction
+        snapshot.moving = state.velocity != (0, 0)
+        snapshot.speed = state.speed
+        snapshot.food = state.food
+        snapshot.obstacles = list(state.obstacles)
+        snapshot.snake = list(state.snake)
+        snapshot.free = array('i', state.free.cells)
+        snapshot.rng_state = state.rng.getstate()
+        if recording is not None:
+            snapshot.recording = Recording(recording.seed, recording.cols, recording.rows, recording.lives)
+            snapshot.recording.inputs = list(recording.inputs)
+        return snapshot
+
+    # A GameState that carries on from the snapshot
+    def restore(self):
+        state = engine.GameState(cols=self.cols, rows=self.rows, lives=self.counters[counters.index('max_lives')])
+        for name, value in zip(counters, self.counters):
+            setattr(state, name, value)
+        state.game_over = self.game_over
+        state.direction = self.direction
+        state.velocity = engine.directions[self.direction] if self.moving else (0, 0)
+        state.speed = self.speed
+        state.food = self.food
+        state.obstacles = set(self.obstacles)
+        state.last_obstacle = None
+        state.snake = engine.Snake(self.cols, self.rows, self.snake)
+        state.rng.setstate(self.rng_state)
+        state.free.cells = array('i', self.free)  # Replacing the new game's index
+        pos = state.free.pos = array('i', [-1]) * (self.cols * self.rows)
+        for i, number in enumerate(self.free):
+            pos[number] = i
+        return state
+
+    def to_bytes(self):
+        cols = self.cols
+        out = bytearray(magic)
+        out.append(format_version)
+        for n in (cols, self.rows, *self.counters):
+            write_varint(out, n)
+        out.append(self.game_over | self.moving << 1 | direction_codes[self.direction] << 2)
+        out += struct.pack('<d', self.speed)
+        write_varint(out, 0 if self.food is None else self.food[1] * cols + self.food[0] + 1)
+        write_varint(out, len(self.obstacles))
+        previous = 0
+        for number in sorted(y * cols + x for x, y in self.obstacles):
+            write_varint(out, number - previous)
+            previous = number
+        write_varint(out, len(self.snake))
+        if self.snake:
+            write_varint(out, self.snake[0][1] * cols + self.snake[0][0])
+            out += pack_moves(self.snake, cols, self.rows)
+        write_varint(out, len(self.free))
+        out += self.pack_free()
+        version, words, gauss = self.rng_state
+        if version != 3 or len(words) != rng_words:
+            raise ValueError(f"unsupported random generator state (version {version})")
+        out += struct.pack(f'<{rng_words}I', *words)
+        if gauss is None:
+            out.append(0)
+        else:
+            out.append(1)
+            out += struct.pack('<d', gauss)
+        recording = b'' if self.recording is None else self.recording.to_bytes()
+        write_varint(out, len(recording))
+        out += recording
+        return bytes(out)
+
+    # Typecode for the free cells in the file
+    def free_typecode(self):
+        return 'H' if self.cols * self.rows <= 1 << 16 else 'I'
+
+    def pack_free(self):
+        cells = array(self.free_typecode(), self.free)
+        if sys.byteorder == 'big':
+            cells.byteswap()
+        return cells.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        if data[:4] != magic:
+            raise ValueError("not a Snake Eater snapshot")
+        if len(data) < 5 or data[4] != format_version:
+            raise ValueError(f"unsupported snapshot version {data[4] if len(data) > 4 else None}")
+        try:
+            return cls.parse(data)
+        except (IndexError, KeyError, struct.error) as e:
+            raise ValueError(f"snapshot is damaged: {e}")
+
+    @classmethod
+    def parse(cls, data):
+        pos = 5
+        fields = []
+        for _ in range(2 + len(counters)):
+            n, pos = read_varint(data, pos)
+            fields.append(n)
+        snapshot = cls(fields[0], fields[1])
+        cols, rows = snapshot.cols, snapshot.rows
+        snapshot.counters = fields[2:]
+        flags = data[pos]
+        snapshot.game_over = bool(flags & 1)
+        snapshot.moving = bool(flags & 2)
+        snapshot.direction = code_directions[flags >> 2 & 3]
+        snapshot.speed, = struct.unpack_from('<d', data, pos + 1)
+        food, pos = read_varint(data, pos + 9)
+        snapshot.food = None if food == 0 else ((food - 1) % cols, (food - 1) // cols)
+        count, pos = read_varint(data, pos)
+        number = 0
+        for _ in range(count):
+            gap, pos = read_varint(data, pos)
+            number += gap
+            snapshot.obstacles.append((number % cols, number // cols))
+        count, pos = read_varint(data, pos)
+        if count:
+            tail, pos = read_varint(data, pos)
+            size = (count + 2) // 4  # Bytes holding count - 1 codes
+            if pos + size > len(data):
+                raise IndexError("snake is cut short")
+            snapshot.snake = unpack_moves(data[pos:pos + size], (tail % cols, tail // cols), count, cols, rows)
+            pos += size
+        count, pos = read_varint(data, pos)
+        cells = array(snapshot.free_typecode())
+        size = count * cells.itemsize
+        if pos + size > len(data):
+            raise IndexError("free cells are cut short")
+        cells.frombytes(data[pos:pos + size])
+        if sys.byteorder == 'big':
+            cells.byteswap()
+        snapshot.free = array('i', cells)
+        pos += size
+        words = struct.unpack_from(f'<{rng_words}I', data, pos)
+        pos += rng_words * 4
+        gauss = None
+        if data[pos]:
+            gauss, = struct.unpack_from('<d', data, pos + 1)
+            pos += 8
+        snapshot.rng_state = (3, words, gauss)
+        size, pos = read_varint(data, pos + 1)
+        if size:
+            snapshot.recording = Recording.from_bytes(data[pos:pos + size])
+        return snapshot
+
+    # Write the file in one go, so a crash never leaves half a snapshot
+    def save(self, path):
+        partial = path + '.part'
+        with open(partial, 'wb') as f:
+            f.write(self.to_bytes())
+        os.replace(partial, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+
+# Saves the game every `interval` seconds without holding up the frame it is
+# called from: maybe_save() only takes the snapshot copy, and a background
+# thread encodes and writes it. If the thread is still busy with the last
+# save when the next one is due, that one is skipped until a later frame.
+class Autosaver:
+    def __init__(self, path, interval=5.0):
+        self.path = path
+        self.interval = interval
+        self.jobs = queue.Queue(maxsize=1)
+        self.last = time.perf_counter()
+        self.saves = 0  # Snapshots written
+        self.thread = threading.Thread(target=self.run, name='autosave', daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            try:
+                job()
+            except OSError as e:
+                print(f"Unable to save the game: {e}")
+
+    def write(self, snapshot):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        snapshot.save(self.path)
+        self.saves += 1
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    # Save if the last save was at least `interval` seconds ago and the
+    # thread is free. Returns True if a save was started.
+    def maybe_save(self, state, recording=None):
+        now = time.perf_counter()
+        if now - self.last < self.interval or self.jobs.full():
+            return False
+        self.last = now
+        snapshot = Snapshot.take(state, recording)
+        self.jobs.put(lambda: self.write(snapshot))
+        return True
+
+    # Save straight away (waiting for a save in progress), e.g. on quitting
+    def save_now(self, state, recording=None):
+        snapshot = Snapshot.take(state, recording)
+        self.jobs.put(lambda: self.write(snapshot))
+        self.last = time.perf_counter()
+
+    # Delete the save, e.g. once the game it holds is over
+    def discard(self):
+        self.jobs.put(self.remove)
+
+    # Finish the saves queued so far and stop the thread
+    def close(self):
+        if self.thread.is_alive():
+            self.jobs.put(None)
+            self.thread.join()
+
+
+# A game part way through: a snake of `length` lying along the Hamiltonian
+# cycle of the board from autopilot.py, tail in the top left corner, with
+# one bomb per level placed by the game's own rules, an apple, and the speed
+# and score that length would have. Needs an even number of rows or columns.
+def scenario(length, level=None, cols=engine.board_cols, rows=engine.board_rows, seed=None):
+    if rows % 2 and cols % 2:
+        raise ValueError("the board needs an even number of rows or columns")
+    if not 1 <= length <= cols * rows:
+        raise ValueError(f"a snake of {length} does not fit on {cols}x{rows}")
+    level = level if level is not None else 1 + (length - 1) // engine.level_length
+    path = [(0, 0)]
+    while len(path) < length:
+        x, y = path[-1]
+        path.append(cycle_step(x, y, cols, rows) if rows % 2 == 0 else cycle_step(y, x, rows, cols)[::-1])
+    state = engine.GameState(cols=cols, rows=rows, seed=seed)
+    state.snake = engine.Snake(cols, rows, path)
+    state.length = state.best_length = length
+    state.score = length - 1
+    state.level = state.best_level = level
+    state.speed = engine.initial_speed + engine.speed_increase * (length - 1)
+    state.ticks = length - 1
+    if length > 1:  # Keep going the way the last segment was laid
+        for name, (dx, dy) in engine.directions.items():
+            if ((path[-2][0] + dx) % cols, (path[-2][1] + dy) % rows) == path[-1]:
+                state.direction = name
+                state.velocity = (dx, dy)
+    state.obstacles = set()
+    state.food = None
+    state.rebuild_free()
+    for _ in range(level):
+        state.create_obstacle()
+    state.last_obstacle = None
+    state.spawn_food()
+    return state
+
+
+# python snapshot.py scenario OUT --length 2000 --level 400 --board 200x200
+# python snapshot.py info FILE...
+def main():
+    parser = argparse.ArgumentParser(description='Snake Eater snapshots')
+    commands = parser.add_subparsers(dest='command', required=True)
+    make = commands.add_parser('scenario', help='write a snapshot of a game part way through')
+    make.add_argument('out')
+    make.add_argument('--length', type=int, required=True)
+    make.add_argument('--level', type=int, help='default: the level that length reaches')
+    make.add_argument('--board', default=f"{engine.board_cols}x{engine.board_rows}", metavar='COLSxROWS')
+    make.add_argument('--seed', type=int, default=0)
+    info = commands.add_parser('info', help='describe snapshots and time loading them')
+    info.add_argument('files', nargs='+')
+    args = parser.parse_args()
+
+    if args.command == 'scenario':
+        try:
+            cols, rows = (int(n) for n in args.board.lower().split('x'))
+            state = scenario(args.length, args.level, cols, rows, args.seed)
+        except ValueError as e:
+            parser.error(str(e))
+        Snapshot.take(state).save(args.out)
+        print(f"{args.out}: length {state.length}, level {state.level}, {len(state.obstacles)} bombs, "
+              f"{os.path.getsize(args.out)} bytes")
+        return
+    failed = False
+    for path in args.files:
+        try:
+            start = time.perf_counter()
+            state = Snapshot.load(path).restore()
+            seconds = time.perf_counter() - start
+        except (OSError, ValueError) as e:
+            print(f"{path}: {e}")
+            failed = True
+            continue
+        print(f"{path}: {state.cols}x{state.rows}, length {state.length}, level {state.level}, "
+              f"{len(state.obstacles)} bombs, lives {state.lives}, total score {state.total_score}, "
+              f"{state.ticks} ticks, {os.path.getsize(path)} bytes, loaded in {seconds * 1000:.1f} ms")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+import io
+import os
+import threading
+import time
+
+import pygame
+
+# All of the game's audio goes through one SoundManager:
+#  - each sound effect is decoded from mp3 once and its PCM samples are
+#    saved in a cache directory, so later runs load the raw samples instead
+#    of decoding again;
+#  - every sound belongs to a category with its own reserved mixer channel,
+#    so a burst of crunches can only cut off the previous crunch, never the
+#    explosion or the menu click;
+#  - the same sound triggered again within min_interval seconds is skipped;
+#  - the volume for music and every effect is set in one call.
+# SilentSoundManager has the same methods and does nothing, for running
+# without an audio device or in headless tools.
+
+
+class SoundManager:
+    def __init__(self, files, channels, cache_dir=None, min_interval=0.05, timed=None):
+        self.files = files  # name -> (file, category)
+        self.cache_dir = cache_dir
+        self.min_interval = min_interval
+        self.timed = timed if timed is not None else (lambda label, load, *args: load(*args))
+        pygame.mixer.set_reserved(len(channels))
+        self.channels = {category: pygame.mixer.Channel(number) for category, number in channels.items()}
+        self.sounds = {}  # name -> pygame.mixer.Sound
+        self.music = {}  # file -> encoded bytes
+        self.last_played = {}  # name -> time it was last started
+        self.volume = 1.0
+        self.pending = {}  # name -> threading.Event set once the background thread loaded it
+        self.lock = threading.Lock()
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    # Decode a sound file, or load its samples from the PCM cache. The cache
+    # file name includes the mixer format, since the samples are stored in it.
+    def decode(self, file):
+        if self.cache_dir is None:
+            return pygame.mixer.Sound(file)
+        frequency, size, channels = pygame.mixer.get_init()
+        stem = os.path.splitext(os.path.basename(file))[0]
+        cached = os.path.join(self.cache_dir, f"{stem}-{frequency}-{size}-{channels}-{os.stat(file).st_mtime_ns}.pcm")
+        if os.path.exists(cached):
+            with open(cached, 'rb') as f:
+                return pygame.mixer.Sound(buffer=f.read())
+        sound = pygame.mixer.Sound(file)
+        partial = cached + '.part'
+        with open(partial, 'wb') as f:
+            f.write(sound.get_raw())
+        os.replace(partial, cached)
+        return sound
+
+    def load(self, name):
+        file = self.files[name][0]
+        sound = self.timed(file, self.decode, file)
+        with self.lock:
+            sound.set_volume(self.volume)
+            self.sounds[name] = sound
+
+    def sound(self, name):
+        sound = self.sounds.get(name)
+        if sound is None:
+            with self.lock:
+                done = self.pending.get(name)
+            if done is not None:
+                done.wait()
+            if name not in self.sounds:
+                self.load(name)
+            sound = self.sounds[name]
+        return sound
+
+    # Read the given music files and then load the given sounds on a
+    # background thread
+    def preload(self, names, music=()):
+        with self.lock:
+            music = [file for file in music if file not in self.pending and file not in self.music]
+            names = [name for name in names if name not in self.pending and name not in self.sounds]
+            for key in music + names:
+                self.pending[key] = threading.Event()
+        thread = threading.Thread(target=self.run_preload, args=(names, music), name='sound-loader', daemon=True)
+        thread.start()
+        return thread
+
+    def run_preload(self, names, music=()):
+        for file in music:
+            try:
+                self.read_music(file)
+            except OSError:
+                pass  # Reading it again when it is played reports the error
+            self.pending[file].set()
+        for name in names:
+            try:
+                self.load(name)
+            except (pygame.error, OSError):
+                pass  # Loading it again when it is played reports the error
+            self.pending[name].set()
+
+    # Play a sound on its category's channel. Returns False if the same sound
+    # was started less than min_interval seconds ago and was skipped.
+    def play(self, name):
+        now = time.perf_counter()
+        if now - self.last_played.get(name, float('-inf')) < self.min_interval:
+            return False
+        self.last_played[name] = now
+        self.channels[self.files[name][1]].play(self.sound(name))
+        return True
+
+    def stop(self, name):
+        if name in self.sounds:
+            self.sounds[name].stop()
+
+    # Volume (0.0 to 1.0) for the music and every sound effect
+    def set_volume(self, volume):
+        self.volume = volume
+        pygame.mixer.music.set_volume(volume)
+        with self.lock:
+            for sound in self.sounds.values():
+                sound.set_volume(volume)
+
+    def read_music(self, file):
+        with open(file, 'rb') as f:
+            data = self.timed(file, f.read)
+        with self.lock:
+            self.music[file] = data
+
+    # Start a music track looping; the file is only read from disk once
+    def play_music(self, file):
+        data = self.music.get(file)
+        if data is None:
+            with self.lock:
+                done = self.pending.get(file)
+            if done is not None:
+                done.wait()
+            if file not in self.music:
+                self.read_music(file)
+            data = self.music[file]
+        pygame.mixer.music.load(io.BytesIO(data), os.path.splitext(file)[1][1:])
+        pygame.mixer.music.set_volume(self.volume)
+        pygame.mixer.music.play(-1)
+
+    def stop_music(self):
+        pygame.mixer.music.stop()
+
+
+class SilentSoundManager:
+    def __init__(self):
+        self.volume = 1.0
+
+    def preload(self, names, music=()):
+        return None
+
+    def play(self, name):
+        return False
+
+    def stop(self, name):
+        pass
+
+    def set_volume(self, volume):
+        self.volume = volume
+
+    def play_music(self, file):
+        pass
+
+    def stop_music(self):
+        pass
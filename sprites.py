@@ -0,0 +1,64 @@
+import pygame
+
+# Snake sprites for every direction, rotated once and packed side by side on
+# a single surface in the display's pixel format. Drawing a frame is then
+# plain blits with no pygame.transform.rotate() and no per-blit pixel format
+# conversion.
+
+# Rotation of the head image (which faces up) for each direction
+head_angles = {'UP': 0, 'RIGHT': 270, 'LEFT': 90, 'DOWN': 180}
+
+# Rotations the tail image can need
+tail_angles = (0, 90, 180, 270)
+
+
+# Rotation of the tail image based on which side the next segment is on
+def tail_angle(tail, next_tail):
+    if tail[0] > next_tail[0]:  # Moving right
+        return 90
+    elif tail[0] < next_tail[0]:  # Moving left
+        return 270
+    elif tail[1] > next_tail[1]:  # Moving down
+        return 0  # No rotation needed
+    else:  # Moving up
+        return 180
+
+
+# Convert a surface to the display's pixel format (keeping per-pixel alpha if
+# asked). Before a window exists, for example in headless tools, the surface
+# is returned as it is.
+def display_format(surface, alpha=True):
+    if pygame.display.get_surface() is None:
+        return surface
+    return surface.convert_alpha() if alpha else surface.convert()
+
+
+class SpriteAtlas:
+    def __init__(self, head_image, body_image, tail_image):
+        variants = [('head', direction, pygame.transform.rotate(head_image, angle))
+                    for direction, angle in head_angles.items()]
+        variants += [('tail', angle, pygame.transform.rotate(tail_image, angle)) for angle in tail_angles]
+        variants.append(('body', None, body_image))
+
+        width, height = body_image.get_size()
+        sheet = pygame.Surface((width * len(variants), height), pygame.SRCALPHA)
+        for i, (_, _, image) in enumerate(variants):
+            sheet.blit(image, (i * width, 0))
+        self.sheet = display_format(sheet)
+
+        self.heads = {}
+        self.tails = {}
+        for i, (kind, key, _) in enumerate(variants):
+            sprite = self.sheet.subsurface((i * width, 0, width, height))
+            if kind == 'head':
+                self.heads[key] = sprite
+            elif kind == 'tail':
+                self.tails[key] = sprite
+            else:
+                self.body = sprite
+
+    def head(self, direction):
+        return self.heads[direction]
+
+    def tail(self, tail, next_tail):
+        return self.tails[tail_angle(tail, next_tail)]
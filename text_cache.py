@@ -0,0 +1,36 @@
+from collections import OrderedDict
+
+# Rendered text surfaces keyed on (font, text, color). Rasterizing text is
+# one of the slowest calls in a frame, and the game draws the same few
+# strings (button labels, score digits) over and over, so each one is only
+# rendered the first time it is asked for. The least recently used entries
+# are dropped once the cache holds max_entries surfaces.
+
+
+class TextCache:
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.surfaces)
+
+    # Same arguments as font.render(text, True, color), always antialiased
+    def render(self, font, text, color):
+        key = (font, text, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = font.render(text, True, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
@@ -0,0 +1,65 @@
+from collections import deque
+
+import engine
+
+# Timing for the game loop, kept apart from rendering. The window draws at
+# whatever frame rate it gets, and FixedTimestep says how many moves of the
+# current length are due: none on a fast frame, several on a slow one or
+# once the snake moves faster than the frame rate. Key presses wait in an
+# InputQueue and each move uses at most one of them, so two quick turns in
+# the same frame are made on two consecutive moves.
+
+
+class FixedTimestep:
+    # Time behind schedule is capped at max_backlog seconds, so after a long
+    # stall (dragging the window, a slow disk) the game skips ahead instead of
+    # running dozens of moves at once.
+    def __init__(self, max_backlog=0.25):
+        self.max_backlog = max_backlog
+        self.backlog = 0.0
+
+    def reset(self):
+        self.backlog = 0.0
+
+    # Add the time the last frame took
+    def advance(self, seconds):
+        self.backlog = min(self.backlog + seconds, self.max_backlog)
+
+    # True (and the time used up) if a move `interval` seconds long is due.
+    # Call it in a loop to run every move that is due.
+    def consume(self, interval):
+        if self.backlog < interval:
+            return False
+        self.backlog -= interval
+        return True
+
+
+class InputQueue:
+    def __init__(self, max_length=3):
+        self.max_length = max_length
+        self.queue = deque()
+
+    def __len__(self):
+        return len(self.queue)
+
+    def clear(self):
+        self.queue.clear()
+
+    # Queue a turn. It is dropped if the queue is full, or if it repeats or
+    # reverses the turn before it (or `current`, the direction the snake has
+    # now, when nothing is queued). Returns whether it was queued.
+    def push(self, direction, current):
+        if len(self.queue) >= self.max_length:
+            return False
+        if self.queue:
+            last = self.queue[-1]
+            if direction == last or direction == engine.opposite[last]:
+                return False
+        elif direction == engine.opposite[current]:
+            return False
+        self.queue.append(direction)
+        return True
+
+    # The turn for the next move, or None
+    def pop(self):
+        return self.queue.popleft() if self.queue else None
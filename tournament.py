@@ -0,0 +1,273 @@
+import argparse
+import csv
+import importlib
+import json
+import multiprocessing
+import os
+import signal
+import statistics
+import sys
+import time
+from array import array
+from collections import Counter
+
+import engine
+from autopilot import Autopilot
+
+# Play a large number of headless games with a bot and summarize the results:
+#   python tournament.py --games 1000000 --out runs/autopilot
+#   python tournament.py --games 100000 --policy greedy --rule level_length=10 --out runs/greedy-l10
+# Games are split into chunks and played across a process pool. Game i is
+# seeded from (--seed, i), so every game is the same however many workers
+# play it and in whatever order. Each finished chunk is appended to
+# games.csv in the output directory. If a run is stopped (Ctrl-C, a crash)
+# and the same command is run again, the games already in games.csv are
+# skipped. --games can be raised to extend a run. When the run ends,
+# summary.json gets the score, length and survival distributions of games
+# 0 to --games - 1 in games.csv.
+
+# Rule settings in engine that --rule may change
+rule_names = ['initial_speed', 'speed_increase', 'level_length', 'safe_distance']
+
+# Columns of games.csv. `seconds` is game-clock time at the speeds the snake
+# moved; `finished` is 0 for games cut off at --max-ticks.
+columns = ['game', 'seed', 'total_score', 'best_length', 'best_level', 'ticks', 'seconds', 'lives_lost', 'finished']
+
+# Per-worker settings, filled in by init_worker()
+worker = {}
+
+
+# Head for the apple by the shortest wrap-around route, avoiding moves that
+# die straight away. Cheap enough for baseline runs of millions of games.
+def greedy(cols, rows):
+    def policy(state):
+        head_x, head_y = state.head
+        food_x, food_y = state.food if state.food is not None else state.head
+        dx = (food_x - head_x) % cols
+        dy = (food_y - head_y) % rows
+        wanted = ['RIGHT' if dx and dx <= cols // 2 else 'LEFT' if dx else None,
+                  'DOWN' if dy and dy <= rows // 2 else 'UP' if dy else None]
+        moves = [name for name in wanted if name] + list(engine.directions)
+        for name in moves:
+            if name == engine.opposite[state.direction]:
+                continue
+            x = (head_x + engine.directions[name][0]) % cols
+            y = (head_y + engine.directions[name][1]) % rows
+            if (x, y) not in state.obstacles and ((x, y) == state.snake.tail or (x, y) not in state.snake):
+                return name
+        return None
+    return policy
+
+
+# Policy name -> factory(cols, rows) returning a policy(state) for one game.
+# Anything else is read as module:function naming such a factory.
+policies = {
+    'autopilot': Autopilot,
+    'greedy': greedy,
+}
+
+
+def policy_factory(name):
+    if name in policies:
+        return policies[name]
+    module, _, function = name.partition(':')
+    return getattr(importlib.import_module(module), function)
+
+
+def game_seed(seed, game):
+    return seed << 40 | game
+
+
+def init_worker(settings):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C is handled by the parent
+    for name, value in settings['rules'].items():
+        setattr(engine, name, value)
+    worker.update(settings)
+    worker['factory'] = policy_factory(settings['policy'])
+
+
+# Play the given games and return their rows for games.csv
+def play_games(games):
+    cols, rows = worker['cols'], worker['rows']
+    results = []
+    for game in games:
+        seed = game_seed(worker['seed'], game)
+        state = engine.GameState(cols=cols, rows=rows, lives=worker['lives'], seed=seed)
+        policy = worker['factory'](cols, rows)
+        seconds = 0.0
+        while not state.game_over and state.ticks < worker['max_ticks']:
+            seconds += 1.0 / state.speed
+            state.step(policy(state))
+        results.append((game, seed, state.total_score, state.best_length, state.best_level, state.ticks,
+                        round(seconds, 3), state.max_lives - state.lives, int(state.game_over)))
+    return results
+
+
+# Which games are already in games.csv (a bytearray flag per game). A line
+# cut short by a crash is removed from the end of the file.
+def finished_games(path, games):
+    done = bytearray(games)
+    if not os.path.exists(path):
+        return done
+    with open(path, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            game = int(row['game'])
+            if game < games:
+                done[game] = 1
+    return done
+
+
+# Chunks of the games not played yet
+def pending_chunks(done, chunk):
+    for start in range(0, len(done), chunk):
+        stop = min(start + chunk, len(done))
+        missing = [game for game in range(start, stop) if not done[game]]
+        if len(missing) == stop - start:
+            yield range(start, stop)
+        elif missing:
+            yield missing
+
+
+def distribution(values):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    n = len(ordered)
+    return {
+        'mean': round(statistics.fmean(ordered), 3),
+        'stdev': round(statistics.pstdev(ordered), 3),
+        'min': ordered[0],
+        'p10': ordered[int((n - 1) * 0.1)],
+        'p50': ordered[(n - 1) // 2],
+        'p90': ordered[int((n - 1) * 0.9)],
+        'p99': ordered[int((n - 1) * 0.99)],
+        'max': ordered[-1],
+    }
+
+
+# Distributions over the games in games.csv numbered below `games` (all of
+# them if None). Moves per life only count finished games: a game cut off at
+# --max-ticks adds moves for a life that never ended.
+def summarize(path, games=None):
+    scores, lengths, ticks, seconds = array('i'), array('i'), array('q'), array('d')
+    finished = 0
+    finished_ticks = 0
+    lives = 0
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            if games is not None and int(row['game']) >= games:
+                continue
+            scores.append(int(row['total_score']))
+            lengths.append(int(row['best_length']))
+            ticks.append(int(row['ticks']))
+            seconds.append(float(row['seconds']))
+            if int(row['finished']):
+                finished += 1
+                finished_ticks += int(row['ticks'])
+                lives += int(row['lives_lost'])
+    return {
+        'games': len(scores),
+        'finished': finished,
+        'total_score': distribution(scores),
+        'best_length': distribution(lengths),
+        'survival_ticks': distribution(ticks),
+        'survival_seconds': distribution(seconds),
+        'ticks_per_life': round(finished_ticks / lives, 3) if lives else None,
+        'score_histogram': dict(sorted(Counter(scores).items())),
+        'length_histogram': dict(sorted(Counter(lengths).items())),
+    }
+
+
+def parse_rule(text):
+    name, _, value = text.partition('=')
+    if name not in rule_names or not value:
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE with NAME one of {', '.join(rule_names)}")
+    try:
+        return name, int(value)
+    except ValueError:
+        try:
+            return name, float(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"{value} is not a number") from None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Play many headless Snake Eater games across all cores')
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--policy', default='autopilot',
+                        help=f"{', '.join(policies)} or module:function returning a policy (default autopilot)")
+    parser.add_argument('--out', required=True, metavar='DIR', help='directory for games.csv and summary.json')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='processes to play in (default: all cores)')
+    parser.add_argument('--chunk', type=int, default=20, help='games per task sent to a worker (default 20)')
+    parser.add_argument('--board', default=f"{engine.board_cols}x{engine.board_rows}", metavar='COLSxROWS')
+    parser.add_argument('--lives', type=int, default=engine.initial_lives)
+    parser.add_argument('--max-ticks', type=int, default=100000, help='cut each game off after this many moves')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the run; game i is seeded from it and i')
+    parser.add_argument('--rule', type=parse_rule, action='append', default=[], metavar='NAME=VALUE',
+                        help=f"change a rule setting ({', '.join(rule_names)})")
+    args = parser.parse_args()
+    try:
+        cols, rows = (int(n) for n in args.board.lower().split('x'))
+    except ValueError:
+        parser.error(f"--board must look like 60x40, not {args.board}")
+
+    settings = {'policy': args.policy, 'cols': cols, 'rows': rows, 'lives': args.lives,
+                'max_ticks': args.max_ticks, 'seed': args.seed, 'rules': dict(args.rule)}
+    policy_factory(args.policy)  # Fail here rather than in every worker
+    os.makedirs(args.out, exist_ok=True)
+    settings_path = os.path.join(args.out, 'run.json')
+    results_path = os.path.join(args.out, 'games.csv')
+    if os.path.exists(settings_path):
+        with open(settings_path) as f:
+            if json.load(f) != settings:
+                sys.exit(f"{args.out} holds a run with different settings; use another --out")
+    else:
+        with open(settings_path, 'w') as f:
+            json.dump(settings, f, indent=1)
+
+    done = finished_games(results_path, args.games)
+    todo = len(done) - sum(done)
+    print(f"{len(done) - todo} games already played, {todo} to go on {args.workers} workers", file=sys.stderr)
+    played = 0
+    start = last_report = time.perf_counter()
+    with open(results_path, 'a', newline='') as f:
+        writer = csv.writer(f)
+        if f.tell() == 0:
+            writer.writerow(columns)
+        pool = multiprocessing.Pool(args.workers, init_worker, (settings,))
+        signal.signal(signal.SIGTERM, signal.default_int_handler)  # `kill` stops the run like Ctrl-C
+        try:
+            for results in pool.imap_unordered(play_games, pending_chunks(done, args.chunk)):
+                writer.writerows(results)
+                f.flush()
+                played += len(results)
+                now = time.perf_counter()
+                if now - last_report >= 2.0 or played == todo:
+                    last_report = now
+                    print(f"{played}/{todo} games, {played / (now - start):.1f} games/sec", file=sys.stderr)
+            pool.close()
+        except KeyboardInterrupt:
+            print(f"Stopped after {played} games; run the same command again to carry on", file=sys.stderr)
+            return
+        finally:
+            pool.terminate()
+            pool.join()
+
+    summary = summarize(results_path, args.games)
+    with open(os.path.join(args.out, 'summary.json'), 'w') as f:
+        json.dump(summary, f, indent=1)
+    for name in ('total_score', 'best_length', 'survival_ticks', 'survival_seconds'):
+        stats = summary[name]
+        if stats:
+            print(f"{name:<17} mean {stats['mean']:>10.1f}  p10 {stats['p10']:>8}  p50 {stats['p50']:>8}  "
+                  f"p90 {stats['p90']:>8}  max {stats['max']:>8}")
+    print(f"{summary['games']} games, {summary['finished']} played to the end, "
+          f"{summary['ticks_per_life']} moves per life in those")
+
+
+if __name__ == '__main__':
+    main()